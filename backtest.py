@@ -0,0 +1,126 @@
+import argparse
+import datetime
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import indicators
+import store
+
+# Backtester for the dashboards' EMA crossover rule: long while EMA(fast) >
+# EMA(slow), flat otherwise. The signal on bar t's close earns the return from
+# t to t+1, so there is no lookahead. `Close > EMA20` (import.py) is the pair (1, 20).
+
+CHUNK = 64  # span pairs per worker task
+
+
+def span_grid(fast, slow):
+    return [(f, s) for f in fast for s in slow if f < s]
+
+
+# All span pairs for one symbol at once: arrays are (pairs x time)
+def evaluate(close, pairs, fee=0.0):
+    close = np.asarray(close, dtype="float64")
+    close = close[~np.isnan(close)]
+    if len(close) < 2 or not pairs:
+        return pd.DataFrame()
+    rets = close[1:] / close[:-1] - 1.0
+    spans = sorted({s for pair in pairs for s in pair})
+    emas = indicators.compute(close, [f"EMA{s}" for s in spans])
+    fast = np.stack([emas[f"EMA{f}"][:, 0] for f, _ in pairs])
+    slow = np.stack([emas[f"EMA{s}"][:, 0] for _, s in pairs])
+
+    position = (fast > slow)[:, :-1].astype("float64")
+    changes = np.abs(np.diff(position, axis=1, prepend=0.0))
+    strategy = position * rets - fee * changes
+    equity = np.cumprod(1.0 + strategy, axis=1)
+    peak = np.maximum.accumulate(equity, axis=1)
+
+    in_market = position > 0
+    bars_in = in_market.sum(axis=1)
+    return pd.DataFrame({
+        "fast": [f for f, _ in pairs],
+        "slow": [s for _, s in pairs],
+        "pnl": equity[:, -1] - 1.0,
+        "hit_rate": ((strategy > 0) & in_market).sum(axis=1) / np.maximum(bars_in, 1),
+        "max_drawdown": (1.0 - equity / peak).max(axis=1),
+        "trades": (np.diff(position, axis=1, prepend=0.0) > 0).sum(axis=1),
+        "exposure": bars_in / position.shape[1],
+        "buy_hold": close[-1] / close[0] - 1.0,
+    })
+
+
+def _task(symbol, close, pairs, fee):
+    result = evaluate(close, pairs, fee)
+    result.insert(0, "symbol", symbol)
+    return result
+
+
+def load_closes(tickers, start, end):
+    closes = {}
+    for ticker in tickers:
+        df = store.read_history(ticker, start, end)
+        if not df.empty:
+            closes[ticker] = df["Close"].to_numpy(dtype="float64")
+    return closes
+
+
+# Every (symbol, pair chunk) runs as one task in a process pool
+def sweep(closes, pairs, fee=0.0, workers=None):
+    chunks = [pairs[i:i + CHUNK] for i in range(0, len(pairs), CHUNK)]
+    tasks = [(symbol, close, chunk, fee) for symbol, close in closes.items() for chunk in chunks]
+    if workers == 1:
+        results = [_task(*t) for t in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_task, *zip(*tasks))) if tasks else []
+    results = [r for r in results if not r.empty]
+    if not results:
+        return pd.DataFrame()
+    return pd.concat(results, ignore_index=True)
+
+
+def _span_range(text):
+    lo, hi, *step = (int(x) for x in text.split(":"))
+    return list(range(lo, hi + 1, step[0] if step else 1))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EMA crossover parameter sweep")
+    parser.add_argument("--tickers", default="ticker.csv", help="CSV with a Ticker column")
+    parser.add_argument("--start", default="2022-01-01")
+    parser.add_argument("--end", default=str(datetime.date.today()))
+    parser.add_argument("--fast", default="2:30", help="lo:hi[:step]")
+    parser.add_argument("--slow", default="10:100:2", help="lo:hi[:step]")
+    parser.add_argument("--fee", type=float, default=0.0, help="cost per position change")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--out", help="write the full result table to this CSV")
+    args = parser.parse_args(argv)
+
+    tickers = pd.read_csv(args.tickers)["Ticker"].dropna().unique().tolist()
+    pairs = span_grid(_span_range(args.fast), _span_range(args.slow))
+    closes = load_closes(tickers, args.start, args.end)
+    results = sweep(closes, pairs, fee=args.fee, workers=args.workers)
+    if results.empty:
+        print("No data.")
+        return results
+    if args.out:
+        results.to_csv(args.out, index=False)
+
+    pd.set_option("display.width", 200)
+    summary = (results.groupby(["fast", "slow"])[["pnl", "hit_rate", "max_drawdown"]]
+               .mean().sort_values("pnl", ascending=False))
+    print(f"{len(pairs)} span pairs x {len(closes)} symbols\n")
+    print("Best pairs (mean over symbols):")
+    print(summary.head(args.top).round(4).to_string())
+    print("\nBest pair per symbol:")
+    best = results.loc[results.groupby("symbol")["pnl"].idxmax()]
+    print(best.round(4).to_string(index=False))
+    return results
+
+
+if __name__ == "__main__":
+    main()
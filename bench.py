@@ -0,0 +1,354 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objs as go
+
+import decimate
+import indicators
+import live
+import loader
+import panel
+import scheduler
+import store
+
+# Offline benchmark suite. Nothing touches the network: a stand-in for the
+# yfinance client serves synthetic bars bootstrapped from the bundled CSVs, and
+# every upstream call (scheduler.yahoo()) is pointed at it for the run.
+#   python bench.py                      run everything, compare with the baseline
+#   python bench.py --sizes 1y-1d,1y-1h  only some data sizes
+#   python bench.py --only indicators    only some benchmarks
+#   python bench.py --save               record the results as the new baseline
+# Exits with status 1 when a benchmark got slower than the baseline by more
+# than --tolerance. Baselines are per machine: re-save after changing hardware.
+
+BASELINE = "bench_baseline.json"
+TOLERANCE = 0.25
+NOISE_MS = 1.0  # differences below this are never reported as regressions
+
+# name: (interval, bars)
+SIZES = {
+    "1y-1d": ("1d", 365),
+    "10y-1d": ("1d", 3650),
+    "1y-1h": ("1h", 8760),
+    "1y-1m": ("1m", 525_600),
+    "3y-1m": ("1m", 1_576_800),
+}
+
+SOURCES = {
+    "BTC-USD": "BTC-USD.csv",
+    "ETH-USD": "data/ETH-USD.csv",
+    "BNB-USD": "BNB-USD.csv",
+    "SOL-USD": "SOL-USD.csv",
+    "DOGE-USD": "DOGE-USD.csv",
+}
+NAMES = ["EMA12", "EMA26", "STD10", "Returns", "Volatility20"]
+LIVE_OVERLAYS = ("EMA12", "EMA26", "STD5")
+LIVE_TICKS = 200
+
+
+# ---------------- Synthetic data ----------------
+# `bars` bars of `interval` ending at the current bar boundary, with returns
+# resampled from the source CSV's daily closes and scaled to the bar length
+def synthesize(path, interval, bars, seed=0):
+    base = loader.load_csv(path).dropna(subset=["Close"])
+    close = base["Close"].to_numpy(dtype="float64")
+    daily = np.diff(np.log(close))
+    volumes = base["Volume"].to_numpy(dtype="float64")
+    delta = store.bar_delta(interval)
+    scale = np.sqrt(delta / pd.Timedelta(days=1))
+
+    rng = np.random.default_rng(seed)
+    steps = rng.choice(daily, bars) * scale
+    close = close[0] * np.exp(np.cumsum(steps))
+    open_ = np.r_[close[0] * np.exp(-steps[0]), close[:-1]]
+    high = np.maximum(open_, close) * (1 + np.abs(rng.choice(daily, bars)) * scale / 2)
+    low = np.minimum(open_, close) * (1 - np.abs(rng.choice(daily, bars)) * scale / 2)
+    volume = np.round(rng.choice(volumes, bars) * (delta / pd.Timedelta(days=1))).astype("int64")
+
+    now = pd.Timestamp.now(tz="UTC")
+    end = now.floor("D") if store.is_daily(interval) else now.floor(delta)
+    index = pd.date_range(end=end, periods=bars, freq=delta, name="Date")
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close,
+                         "Volume": volume}, index=index)
+
+
+# Stand-in for the parts of the yfinance client this repo calls. Bars for each
+# (ticker, interval) are synthesized on first use; `clock`, when set, hides
+# every bar after it so a live feed can be replayed bar by bar.
+class OfflineYahoo:
+    def __init__(self, bars, sources=SOURCES):
+        self.bars = bars  # {interval: number of bars}
+        self.sources = sources
+        self.clock = None
+        self.requests = 0
+        self._frames = {}
+
+    def frame(self, ticker, interval):
+        key = (ticker, interval)
+        if key not in self._frames:
+            self._frames[key] = synthesize(self.sources[ticker], interval, self.bars[interval],
+                                           seed=zlib.crc32(ticker.encode()))
+        df = self._frames[key]
+        return df if self.clock is None else df.loc[:self.clock]
+
+    def _slice(self, ticker, interval, start=None, end=None, period=None):
+        self.requests += 1
+        df = self.frame(ticker, interval)
+        if period is not None and period != "max":
+            start = store.period_start(period, pd.Timestamp.now(tz="UTC"))
+        if start is not None:
+            df = df.loc[store.to_utc(start):]
+        if end is not None:
+            df = df.loc[:store.to_utc(end) - pd.Timedelta(1, "ns")]
+        return df
+
+    def Ticker(self, ticker):
+        client = self
+
+        class _Ticker:
+            def history(self, start=None, end=None, period=None, interval="1d", **kwargs):
+                return client._slice(ticker, interval, start, end, period).copy()
+
+        return _Ticker()
+
+    # Columns are (Price, Ticker) like yf.download
+    def download(self, tickers, start=None, end=None, period=None, interval="1d", **kwargs):
+        symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+        frames = {t: self._slice(t, interval, start, end, period) for t in symbols}
+        if all(f.empty for f in frames.values()):
+            return pd.DataFrame()
+        raw = pd.concat(frames, axis=1).swaplevel(axis=1)
+        raw.columns.names = ["Price", "Ticker"]
+        return raw.sort_index(axis=1)
+
+
+_unlimited = None
+
+
+# Point every upstream call at `client` and the store at a scratch directory;
+# upstream calls are not rate limited while offline
+@contextlib.contextmanager
+def offline(client, directory):
+    global _unlimited
+    if _unlimited is None:
+        _unlimited = scheduler.Scheduler(
+            {name: (1e9, 1e9, concurrency) for name, (_, _, concurrency) in scheduler.PROVIDERS.items()})
+    saved = (scheduler._yfinance, store.STORE_DIR, scheduler._scheduler)
+    scheduler._yfinance = client
+    store.STORE_DIR = directory
+    scheduler._scheduler = _unlimited
+    try:
+        yield client
+    finally:
+        scheduler._yfinance, store.STORE_DIR, scheduler._scheduler = saved
+
+
+# ---------------- Benchmarks ----------------
+# Each takes (client, interval, scratch dir) and returns (rows, fn to time).
+# The scratch dir is empty and belongs to that benchmark and data size alone.
+
+def bench_csv_load(client, interval, tmp):
+    path = os.path.join(tmp, f"BTC-USD-{interval}.csv")
+    df = client.frame("BTC-USD", interval)
+    df.to_csv(path)
+    return len(df), lambda: loader.load_csv(path)
+
+
+def bench_store_cold(client, interval, tmp):
+    df = client.frame("BTC-USD", interval)
+    runs = iter(range(10 ** 6))
+
+    def run():
+        with offline(client, os.path.join(tmp, f"cold-{next(runs)}")):
+            store.read_history("BTC-USD", df.index[0], df.index[-1] + store.bar_delta(interval), interval)
+    return len(df), run
+
+
+# Settled bars only: the last synthetic bar is still forming, and a range
+# including it would go upstream on every call
+def bench_store_warm(client, interval, tmp):
+    df = client.frame("BTC-USD", interval)
+    end = df.index[-1]
+    with offline(client, tmp):
+        store.read_history("BTC-USD", df.index[0], end, interval)
+
+    def run():
+        with offline(client, tmp):
+            store.read_history("BTC-USD", df.index[0], end, interval)
+    return len(df) - 1, run
+
+
+def bench_indicators(client, interval, tmp):
+    close = client.frame("BTC-USD", interval)["Close"].to_numpy()
+    return len(close), lambda: indicators.compute(close, NAMES)
+
+
+# The comparison tab's load: each symbol's settled bars read from the warm store
+# on a thread pool (as pyramid.bars_many does), joined by panel.from_bars and
+# as-of aligned onto the main chart's timestamps
+def bench_alignment(client, interval, tmp):
+    symbols = list(client.sources)
+    index = client.frame(symbols[0], interval).index
+    start, end = index[0], index[-1]
+
+    def read(ticker):
+        return store.read_history(ticker, start, end, interval)
+    with offline(client, tmp):
+        for t in symbols:
+            read(t)
+
+    def run():
+        with offline(client, tmp), ThreadPoolExecutor(max_workers=len(symbols)) as pool:
+            frames = dict(zip(symbols, pool.map(read, symbols)))
+        panel.align_panel(panel.from_bars(frames), index, normalize=True)
+    return len(index) * len(symbols), run
+
+
+# The main chart of final.py, serialized the way Streamlit ships it
+def bench_figure(client, interval, tmp):
+    df = client.frame("BTC-USD", interval)
+    ind = indicators.compute(df["Close"].to_numpy(), ["EMA12", "EMA26"])
+
+    def run():
+        fig = go.Figure()
+        fig.add_trace(decimate.candlestick(x=df.index, open=df["Open"], high=df["High"],
+                                           low=df["Low"], close=df["Close"], name="Candlestick"))
+        fig.add_trace(decimate.scatter(x=df.index, y=ind["EMA12"], name="EMA 12"))
+        fig.add_trace(decimate.scatter(x=df.index, y=ind["EMA26"], name="EMA 26"))
+        fig.add_trace(decimate.bar(x=df.index, y=df["Volume"], name="Volume", yaxis="y2"))
+        fig.update_layout(yaxis2=dict(overlaying="y", side="right"))
+        fig.to_json()
+    return len(df), run
+
+
+# One poll of a live feed per tick: the stand-in's clock moves one bar, the
+# poller revises the forming bar, appends the new one and advances its overlays
+def bench_live_tick(client, interval, tmp):
+    df = client.frame("BTC-USD", interval)
+    warmup = min(len(df) - LIVE_TICKS, 1440)
+    if warmup < 1:
+        return 0, None
+
+    def run():
+        with offline(client, tmp):
+            client.clock = df.index[warmup - 1]
+            poller = live.TailPoller("BTC-USD", df.index[0], interval, capacity=1440,
+                                     overlays=LIVE_OVERLAYS)
+            poller.poll()
+            for t in df.index[warmup:warmup + LIVE_TICKS]:
+                client.clock = t
+                poller.poll()
+            client.clock = None
+    return LIVE_TICKS, run
+
+
+BENCHMARKS = {
+    "csv_load": bench_csv_load,
+    "store_cold": bench_store_cold,
+    "store_warm": bench_store_warm,
+    "indicators": bench_indicators,
+    "alignment": bench_alignment,
+    "figure": bench_figure,
+    "live_tick": bench_live_tick,
+}
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+# The bundled CSVs themselves, as shipped
+def bundled_csv_load(repeat):
+    paths = [p for p in loader.BUNDLED if os.path.exists(p)]
+    rows = sum(len(loader.load_csv(p)) for p in paths)
+    ms = _best_of(lambda: [loader.load_csv(p) for p in paths], repeat) * 1000
+    return {"bench": "csv_load", "size": "bundled", "rows": rows, "ms": ms}
+
+
+def run(sizes, only, repeat=3):
+    results = []
+    if "csv_load" in only:
+        results.append(bundled_csv_load(repeat))
+    with tempfile.TemporaryDirectory(prefix="stock-bench-") as tmp:
+        for size in sizes:
+            interval, bars = SIZES[size]
+            client = OfflineYahoo({interval: bars})
+            for name in only:
+                scratch = os.path.join(tmp, size, name)
+                os.makedirs(scratch)
+                rows, fn = BENCHMARKS[name](client, interval, scratch)
+                if fn is None:
+                    continue
+                fn()  # warm-up: imports, first-call caches
+                ms = _best_of(fn, repeat) * 1000
+                results.append({"bench": name, "size": size, "rows": rows, "ms": ms})
+                print(f"  {name:<12} {size:<8} {ms:10.2f} ms", file=sys.stderr)
+    return pd.DataFrame(results)
+
+
+def load_baseline(path=BASELINE):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return {(r["bench"], r["size"]): r["ms"] for r in json.load(f)["results"]}
+
+
+def save_baseline(results, path=BASELINE):
+    with open(path, "w") as f:
+        json.dump({"machine": platform.platform(), "python": platform.python_version(),
+                   "saved_at": pd.Timestamp.now(tz="UTC").isoformat(),
+                   "results": results.round(3).to_dict("records")}, f, indent=1)
+
+
+# Adds baseline_ms / change columns; `regressed` marks results slower than tolerance allows
+def compare(results, baseline, tolerance=TOLERANCE):
+    results = results.copy()
+    results["baseline_ms"] = [baseline.get((b, s), np.nan) for b, s in zip(results["bench"], results["size"])]
+    results["change"] = results["ms"] / results["baseline_ms"] - 1
+    results["regressed"] = ((results["change"] > tolerance)
+                            & (results["ms"] - results["baseline_ms"] > NOISE_MS))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline performance benchmarks")
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"comma-separated, from {', '.join(SIZES)}")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help=f"comma-separated, from {', '.join(BENCHMARKS)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes.split(","), args.only.split(","), args.repeat)
+    table = compare(results, load_baseline(args.baseline), args.tolerance)
+    pd.set_option("display.width", 200)
+    print(table.round({"ms": 2, "baseline_ms": 2, "change": 3}).to_string(index=False))
+    if args.save:
+        save_baseline(results, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    regressed = table[table["regressed"]]
+    if len(regressed):
+        print(f"{len(regressed)} benchmark(s) slower than baseline by more than {args.tolerance:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,123 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import indicators
+import memo
+import profiling
+import store
+
+# N-symbol return correlations over an aligned close panel (time x symbol).
+#   matrix(returns)           full matrix, pairwise-complete like DataFrame.corr()
+#   rolling(returns, window)  every pair's rolling correlation, like
+#                             returns[a].rolling(window).corr(returns[b])
+# Both are built from sums over the rows where both symbols have a value: the
+# matrix from a few matrix products, the rolling version from cumulative sums
+# differenced over the window - never one rolling().corr() per pair.
+
+PAIR_BLOCK = 256  # pairs per cumulative-sum pass: memory ~ 6 x rows x PAIR_BLOCK floats
+_cache = memo.LRU(32)
+
+
+# Daily closes for every ticker from the store, outer-joined on date.
+# Returns (closes, {ticker: error message}) like screener.screen
+def load_panel(tickers, start, end, workers=8):
+    tickers = list(dict.fromkeys(tickers))
+    closes, errors = {}, {}
+
+    def run(ticker):
+        try:
+            return ticker, store.read_history(ticker, start, end)["Close"], None
+        except Exception as e:
+            return ticker, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tickers)))) as pool:
+        for ticker, close, error in pool.map(run, tickers):
+            if error is not None:
+                errors[ticker] = error
+            elif not close.notna().any():
+                errors[ticker] = "no data"
+            else:
+                closes[ticker] = close
+    if not closes:
+        return pd.DataFrame(), errors
+    return pd.DataFrame(closes).sort_index(), errors
+
+
+def returns(close):
+    return pd.DataFrame(indicators.returns(close.to_numpy(dtype="float64")),
+                        index=close.index, columns=close.columns)
+
+
+def pairs(columns):
+    i, j = np.triu_indices(len(columns), 1)
+    return i, j
+
+
+def _corr(n, sx, sy, sxx, syy, sxy, min_periods):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sxy - sx * sy / n
+        var = (sxx - sx ** 2 / n) * (syy - sy ** 2 / n)
+        out = cov / np.sqrt(var)
+    out[(n < min_periods) | ~(var > 0)] = np.nan
+    return np.clip(out, -1.0, 1.0)
+
+
+# Columns centred on their mean (for precision) and zero where missing, plus the valid mask
+def _centred(values):
+    valid = ~np.isnan(values)
+    with np.errstate(invalid="ignore"):
+        mean = np.nanmean(np.where(valid.any(axis=0), values, 0.0), axis=0)
+    return np.where(valid, values - mean, 0.0), valid.astype("float64")
+
+
+def matrix(rets, min_periods=2):
+    z, m = _centred(rets.to_numpy(dtype="float64"))
+    n = m.T @ m
+    sx = (z.T @ m)          # sx[a, b]: sum of a over rows where b is valid too
+    sxx = (z ** 2).T @ m
+    out = _corr(n, sx, sx.T, sxx, sxx.T, z.T @ z, min_periods)
+    return pd.DataFrame(out, index=rets.columns, columns=rets.columns)
+
+
+# (rows x pairs) rolling correlations; columns are (symbol a, symbol b) with a before b
+def rolling(rets, window, min_periods=None):
+    min_periods = window if min_periods is None else min_periods
+    z, m = _centred(rets.to_numpy(dtype="float64"))
+    a, b = pairs(rets.columns)
+    out = np.full((len(z), len(a)), np.nan)
+    for lo in range(0, len(a), PAIR_BLOCK):
+        ia, ib = a[lo:lo + PAIR_BLOCK], b[lo:lo + PAIR_BLOCK]
+        both = m[:, ia] * m[:, ib]
+        x, y = z[:, ia] * both, z[:, ib] * both
+        sums = np.stack([both, x, y, x * x, y * y, x * y])
+        win = np.cumsum(sums, axis=1)
+        # Sums over the last `window` rows; the first rows keep everything so far
+        win[:, window:] -= win[:, :-window].copy()
+        out[:, lo:lo + len(ia)] = _corr(*win, min_periods)
+    columns = pd.MultiIndex.from_arrays([rets.columns[a], rets.columns[b]])
+    return pd.DataFrame(out, index=rets.index, columns=columns)
+
+
+# One row of rolling() back as a symmetric matrix
+def matrix_at(roll, row, symbols):
+    values = roll.iloc[row].to_numpy()
+    out = np.eye(len(symbols))
+    a, b = pairs(symbols)
+    out[a, b] = out[b, a] = values
+    return pd.DataFrame(out, index=symbols, columns=symbols)
+
+
+# (correlation matrix, rolling pairwise correlations) of a close panel's returns, cached
+def analyze(close, window, label=None):
+    key = (label, memo.fingerprint(close), window)
+    found = _cache.get(key)
+    profiling.count("correlation", hit=found is not None)
+    if found is not None:
+        return found
+    with profiling.stage("correlation", symbols=close.shape[1], window=window):
+        rets = returns(close)
+        found = matrix(rets), rolling(rets, window)
+    _cache.put(key, found)
+    return found
@@ -0,0 +1,133 @@
+import datetime
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+import scheduler
+import store
+
+# Crypto universe priced in other currencies: crypto_prices_in_<quote>.csv is a
+# wide Date x symbol panel of daily closes and crypto_tickers_<quote>.csv its
+# universe (read by try.py). One batched download brings the USD closes of the
+# whole universe plus each quote's USD<quote>=X rate; conversion is a single
+# broadcast multiply per quote, and existing panels only get the new dates appended.
+#   python currency.py INR EUR
+
+UNIVERSE = ["BTC-USD", "ETH-USD", "BNB-USD", "SOL-USD", "ADA-USD",
+            "DOGE-USD", "XRP-USD", "LTC-USD", "DOT-USD", "LINK-USD"]
+DEFAULT_START = datetime.date(2025, 7, 4)
+# FX trades on weekdays only: rates are carried over weekends for up to this long
+FX_LOOKBACK = pd.Timedelta(days=7)
+
+
+def panel_path(quote, directory="."):
+    return os.path.join(directory, f"crypto_prices_in_{quote.lower()}.csv")
+
+
+def tickers_path(quote, directory="."):
+    return os.path.join(directory, f"crypto_tickers_{quote.lower()}.csv")
+
+
+def fx_symbol(quote):
+    return f"USD{quote.upper()}=X"
+
+
+# Date of the last row and the tickers with a close on it, read from the end of
+# the file; (None, set()) for a header-only file
+def last_row(path):
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 4096))
+        fields = f.read().decode().strip().splitlines()[-1].split(",")
+    if fields[0] == "Date":
+        return None, set()
+    return store.to_utc(fields[0]), {t for t, value in zip(header(path), fields[1:]) if value}
+
+
+def header(path):
+    with open(path) as f:
+        return f.readline().rstrip("\r\n").split(",")[1:]
+
+
+# Daily closes (date x symbol) for every symbol, in one yf.download call
+def fetch_closes(symbols, start, end):
+    raw = scheduler.call("yahoo", scheduler.HISTORY, scheduler.yahoo().download, list(symbols),
+                         start=start, end=end, interval="1d", group_by="column",
+                         threads=True, progress=False)
+    if raw.empty:
+        return pd.DataFrame(columns=list(symbols), dtype="float64")
+    close = raw["Close"].reindex(columns=list(symbols))
+    close.index = store.normalize_index(close.index, "1d")
+    return close[~close.index.duplicated(keep="last")].sort_index()
+
+
+# USD closes (date x symbol) times a rate per date, in one broadcast multiply
+def convert(usd, rate):
+    return pd.DataFrame(usd.to_numpy() * rate.to_numpy()[:, None], index=usd.index, columns=usd.columns)
+
+
+# Append the settled days missing from each quote's panel (rebuilding a panel
+# whose universe changed). The append stops at the last day on which every
+# ticker with history has a close: a symbol that failed inside the batched
+# download comes back as NaN, and rows past it would never be fetched again.
+# Returns {quote: rows added}
+def update(quotes, tickers=None, directory=".", start=DEFAULT_START):
+    tickers = list(tickers or UNIVERSE)
+    quotes = [q.upper() for q in quotes]
+    # Today's close is still forming, so panels stop at yesterday
+    end = store.to_utc(datetime.datetime.now(datetime.timezone.utc)).floor("D")
+    last, listed = {}, {}
+    for quote in quotes:
+        path = panel_path(quote, directory)
+        found = os.path.exists(path) and header(path) == tickers
+        last[quote], listed[quote] = last_row(path) if found else (None, set())
+    begin = {q: store.to_utc(start) if last[q] is None else last[q] + pd.Timedelta(days=1) for q in quotes}
+    todo = [q for q in quotes if begin[q] < end]
+    if not todo:
+        return {q: 0 for q in quotes}
+
+    first = min(begin[q] for q in todo)
+    rates = [fx_symbol(q) for q in todo if q != "USD"]
+    closes = fetch_closes(tickers + rates, first - FX_LOOKBACK, end)
+    usd = closes[tickers].loc[first:]
+    usd = usd[usd.notna().any(axis=1)]
+
+    added = {q: 0 for q in quotes}
+    for quote in todo:
+        if quote == "USD":
+            rate = pd.Series(1.0, index=usd.index)
+        else:
+            rate = closes[fx_symbol(quote)].ffill(limit=FX_LOOKBACK.days).reindex(usd.index)
+        rows = convert(usd, rate).loc[begin[quote]:]
+        rows = rows[rate.loc[begin[quote]:].notna()]
+        expected = listed[quote] | set(usd.columns[usd.notna().any()])
+        complete = rows[sorted(expected)].notna().all(axis=1)
+        rows = rows.loc[:complete[complete].index.max()] if complete.any() else rows.iloc[:0]
+        added[quote] = _write(quote, rows, directory, append=last[quote] is not None)
+        pd.DataFrame({"Ticker": tickers}).to_csv(tickers_path(quote, directory), index=False)
+    return added
+
+
+def _write(quote, rows, directory, append):
+    out = rows.copy()
+    out.index = out.index.strftime("%Y-%m-%d")
+    out.index.name = "Date"
+    path = panel_path(quote, directory)
+    if append:
+        out.to_csv(path, mode="a", header=False)
+    else:
+        out.to_csv(path)
+    return len(out)
+
+
+def load(quote, directory="."):
+    df = pd.read_csv(panel_path(quote, directory), index_col="Date", parse_dates=True)
+    df.index = store.normalize_index(df.index, "1d")
+    return df.astype(np.float64)
+
+
+if __name__ == "__main__":
+    for quote, count in update(sys.argv[1:] or ["INR"]).items():
+        print(f"{panel_path(quote)}: {count} new rows")
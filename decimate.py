@@ -0,0 +1,111 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# Server-side downsampling for Plotly traces. Every trace is cut to about the
+# on-screen pixel budget before it is serialized:
+#   lines   - Largest-Triangle-Three-Buckets (keeps peaks and troughs)
+#   candles - OHLC bucketing (first open, max high, min low, last close), so
+#             each bucket keeps its extremes
+#   bars    - summed per bucket, so a bucket's bar is its total volume
+# Series already under the budget pass through untouched.
+
+MAX_POINTS = 2000
+
+
+def _as_float(x):
+    x = np.asarray(x)
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype("datetime64[ns]").astype("int64").astype("float64")
+    if x.dtype == object:  # tz-aware timestamps from pandas
+        return np.array([v.value for v in x], dtype="float64")
+    return x.astype("float64")
+
+
+def _x_values(x):
+    # DatetimeIndex (tz-aware or not) -> numpy datetime64 keeps tz-free UTC nanoseconds
+    if hasattr(x, "tz") and getattr(x, "tz", None) is not None:
+        return np.asarray(x.tz_convert("UTC").tz_localize(None))
+    return np.asarray(x)
+
+
+# Indices of the points LTTB keeps; first and last points are always kept
+def lttb(x, y, n_out):
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    xf, yf = _as_float(x), np.asarray(y, dtype="float64")
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)  # n_out - 2 inner buckets
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Average of the next bucket (or the last point) is the third triangle corner
+        nlo, nhi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = xf[nlo:nhi].mean(), yf[nlo:nhi].mean()
+        area = np.abs((xf[a] - cx) * (yf[lo:hi] - yf[a]) - (xf[a] - xf[lo:hi]) * (cy - yf[a]))
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+# Start index of each of n_out equal-count buckets
+def _bucket_starts(n, n_out):
+    return np.unique(np.linspace(0, n, n_out, endpoint=False).astype(np.int64))
+
+
+def ohlc(x, open_, high, low, close, n_out):
+    n = len(close)
+    starts = _bucket_starts(n, n_out)
+    ends = np.r_[starts[1:], n] - 1
+    x = _x_values(x)
+    return (
+        x[starts],
+        np.asarray(open_, dtype="float64")[starts],
+        np.maximum.reduceat(np.asarray(high, dtype="float64"), starts),
+        np.minimum.reduceat(np.asarray(low, dtype="float64"), starts),
+        np.asarray(close, dtype="float64")[ends],
+    )
+
+
+def summed(x, y, n_out):
+    y = np.nan_to_num(np.asarray(y, dtype="float64"))
+    starts = _bucket_starts(len(y), n_out)
+    return _x_values(x)[starts], np.add.reduceat(y, starts)
+
+
+def _flat(values):
+    values = np.asarray(values)
+    return values.reshape(len(values), -1)[:, 0] if values.ndim > 1 else values
+
+
+# (x, y) arrays for a line, NaN gaps dropped only when decimation kicks in
+def line(x, y, max_points=MAX_POINTS):
+    y = _flat(y)
+    if len(y) <= max_points:
+        return x, y
+    x = _x_values(x)
+    y = np.asarray(y, dtype="float64")
+    ok = ~np.isnan(y)
+    x, y = x[ok], y[ok]
+    keep = lttb(x, y, max_points)
+    return x[keep], y[keep]
+
+
+def scatter(x, y, max_points=MAX_POINTS, **kwargs):
+    x, y = line(x, y, max_points)
+    return go.Scatter(x=x, y=y, **kwargs)
+
+
+def candlestick(x, open, high, low, close, max_points=MAX_POINTS, **kwargs):
+    open, high, low, close = (_flat(v) for v in (open, high, low, close))
+    if len(close) > max_points:
+        x, open, high, low, close = ohlc(x, open, high, low, close, max_points)
+    return go.Candlestick(x=x, open=open, high=high, low=low, close=close, **kwargs)
+
+
+def bar(x, y, max_points=MAX_POINTS, **kwargs):
+    y = _flat(y)
+    if len(y) > max_points:
+        x, y = summed(x, y, max_points)
+    return go.Bar(x=x, y=y, **kwargs)
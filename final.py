@@ -1,11 +1,17 @@
-import yfinance as yf
-import pandas as pd
 import plotly.graph_objs as go
-from plotly.subplots import make_subplots
 import streamlit as st
 
+import decimate
+import indicators
+import panel
+import profiling
+import pyramid
+import shared_cache
+import store
+
 # ---------------- Streamlit UI ----------------
 st.set_page_config(page_title="💹 Advanced Crypto Dashboard", layout="wide")
+profiling.start_run("final", st)
 
 st.title("💹 Advanced Crypto Dashboard")
 st.write("Analyze cryptocurrencies with EMA, Volume, Volatility, and Price Comparison.")
@@ -22,54 +28,68 @@ crypto_options = {
 crypto_name = st.sidebar.selectbox("Select Main Cryptocurrency", list(crypto_options.keys()))
 crypto_symbol = crypto_options[crypto_name]
 
-interval = st.sidebar.selectbox("Select Interval", ["5m", "15m", "30m", "1h", "1d"], index=2)
+interval = st.sidebar.selectbox("Select Interval", [pyramid.AUTO] + pyramid.LEVELS, index=3)
 period = st.sidebar.selectbox("Select Period", ["1d", "5d", "1mo", "3mo", "6mo"], index=1)
 
-# Comparison selection (exclude main crypto)
-compare_options = {k: v for k, v in crypto_options.items() if k != crypto_name}
-compare_cryptos = st.sidebar.multiselect("Compare with Other Cryptos", list(compare_options.keys()))
-
-normalize = st.sidebar.checkbox("Normalize Comparison (Start = 100)", value=True)
-
 # ---------------- Fetch Data ----------------
+# Only the period's base interval is read from the store; the other intervals are
+# levels of the same pyramid, so switching interval never refetches.
+# Returns (bars, interval served)
+@profiling.timed("load_data")
 @st.cache_data(ttl=60)
 def load_data(symbol, period, interval):
-    return yf.download(symbol, period=period, interval=interval)
+    profiling.mark_miss()
+    return pyramid.bars(symbol, period, interval)
 
-df = load_data(crypto_symbol, period, interval)
+# Shared across Streamlit workers; concurrent misses wait for a single load
+@profiling.timed("load_panel")
+@st.cache_data(ttl=60)
+def load_panel(symbols, period, interval):
+    profiling.mark_miss()
+    return shared_cache.cache(store.STORE_DIR).get_or_compute(
+        ("panel", symbols, period, interval),
+        lambda: panel.from_bars(pyramid.bars_many(symbols, period, interval)), ttl=60)
 
 # ---------------- Tabs ----------------
-tab1, tab2 = st.tabs(["📊 Main Analysis", "📈 Comparison"])
+# Each tab is a fragment: the comparison controls live in their tab and only rerun it
 
-with tab1:
+@st.fragment
+@profiling.fragment("final")
+def main_tab(df, interval):
     if df.empty:
         st.error("❌ No data found. Try another crypto or interval.")
     else:
         # EMA + Volatility
-        df["EMA12"] = df["Close"].ewm(span=12, adjust=False).mean()
-        df["EMA26"] = df["Close"].ewm(span=26, adjust=False).mean()
-        df["Returns"] = df["Close"].pct_change()
-        df["Volatility"] = df["Returns"].rolling(window=20).std() * (len(df) ** 0.5)
+        ind = indicators.for_series(df["Close"], ["EMA12", "EMA26", "Returns", "Volatility20"],
+                                    label=(crypto_symbol, interval))
+        df["EMA12"] = ind["EMA12"]
+        df["EMA26"] = ind["EMA26"]
+        df["Returns"] = ind["Returns"]
+        df["Volatility"] = ind["Volatility20"] * (len(df) ** 0.5)
+
+        if interval != requested:
+            st.caption(f"Showing {interval} bars for the {period} period.")
 
         # Chart with EMA + Volume
-        fig = go.Figure()
-        fig.add_trace(go.Candlestick(
-            x=df.index, open=df["Open"], high=df["High"], low=df["Low"], close=df["Close"], name="Candlestick"))
-        fig.add_trace(go.Scatter(x=df.index, y=df["EMA12"], line=dict(color="orange", width=1.5), name="EMA 12"))
-        fig.add_trace(go.Scatter(x=df.index, y=df["EMA26"], line=dict(color="blue", width=1.5), name="EMA 26"))
-        fig.add_trace(go.Bar(x=df.index, y=df["Volume"], name="Volume",
-                             marker=dict(color="purple"), opacity=0.3, yaxis="y2"))
-
-        fig.update_layout(
-            title=f"{crypto_name} ({crypto_symbol}) Chart with EMA & Volume",
-            xaxis_title="Time",
-            yaxis_title="Price (USD)",
-            xaxis_rangeslider_visible=False,
-            template="plotly_dark",
-            height=600,
-            yaxis2=dict(title="Volume", overlaying="y", side="right", showgrid=False)
-        )
-        st.plotly_chart(fig, use_container_width=True)
+        with profiling.stage("figure"):
+            fig = go.Figure()
+            fig.add_trace(decimate.candlestick(
+                x=df.index, open=df["Open"], high=df["High"], low=df["Low"], close=df["Close"], name="Candlestick"))
+            fig.add_trace(decimate.scatter(x=df.index, y=df["EMA12"], line=dict(color="orange", width=1.5), name="EMA 12"))
+            fig.add_trace(decimate.scatter(x=df.index, y=df["EMA26"], line=dict(color="blue", width=1.5), name="EMA 26"))
+            fig.add_trace(decimate.bar(x=df.index, y=df["Volume"], name="Volume",
+                                 marker=dict(color="purple"), opacity=0.3, yaxis="y2"))
+
+            fig.update_layout(
+                title=f"{crypto_name} ({crypto_symbol}) Chart with EMA & Volume",
+                xaxis_title="Time",
+                yaxis_title="Price (USD)",
+                xaxis_rangeslider_visible=False,
+                template="plotly_dark",
+                height=600,
+                yaxis2=dict(title="Volume", overlaying="y", side="right", showgrid=False)
+            )
+        profiling.plotly_chart(st, fig, use_container_width=True)
 
         # Prediction
         if df["EMA12"].iloc[-1] > df["EMA26"].iloc[-1]:
@@ -79,53 +99,63 @@ with tab1:
 
         # Volatility
         st.subheader("📊 Volatility")
-        vol_fig = go.Figure()
-        vol_fig.add_trace(go.Scatter(x=df.index, y=df["Volatility"], line=dict(color="red"), name="Volatility"))
-        vol_fig.update_layout(template="plotly_dark", height=300, title="Volatility (20-period Rolling StdDev)")
-        st.plotly_chart(vol_fig, use_container_width=True)
+        with profiling.stage("figure"):
+            vol_fig = go.Figure()
+            vol_fig.add_trace(decimate.scatter(x=df.index, y=df["Volatility"], line=dict(color="red"), name="Volatility"))
+            vol_fig.update_layout(template="plotly_dark", height=300, title="Volatility (20-period Rolling StdDev)")
+        profiling.plotly_chart(st, vol_fig, use_container_width=True)
 
         with st.expander("🔍 Show Data Table"):
             st.dataframe(df.tail(50))
 
-with tab2:
+@st.fragment
+@profiling.fragment("final")
+def comparison_tab(df, interval):
+    # Comparison selection (exclude main crypto)
+    compare_options = {k: v for k, v in crypto_options.items() if k != crypto_name}
+    compare_cryptos = st.multiselect("Compare with Other Cryptos", list(compare_options.keys()))
+    normalize = st.checkbox("Normalize Comparison (Start = 100)", value=True)
+
     if compare_cryptos:
         st.subheader("📈 Crypto Price & Volume Comparison")
 
-        # Dictionary to hold aligned data
-        compare_data = pd.DataFrame(index=df.index)
-        compare_data[crypto_name] = df["Close"]
-        volume_data = pd.DataFrame(index=df.index)
-        volume_data[crypto_name] = df["Volume"]
-
-        # Add other cryptos
-        for c in compare_cryptos:
-            comp_df = load_data(compare_options[c], period, interval)
-            if not comp_df.empty:
-                comp_df = comp_df.reindex(df.index, method="ffill")  # align timestamps
-                compare_data[c] = comp_df["Close"]
-                volume_data[c] = comp_df["Volume"]
-
-        # Normalize if needed
-        if normalize:
-            compare_data = compare_data / compare_data.iloc[0] * 100
+        # Same pyramid level as the main chart, aligned to its timestamps
+        names = {crypto_symbol: crypto_name}
+        names.update({compare_options[c]: c for c in compare_cryptos})
+        fields = load_panel(tuple(names), period, interval)
+        compare_data, volume_data = panel.align_panel(fields, df.index, normalize)
+        compare_data = compare_data.rename(columns=names)
+        volume_data = volume_data.rename(columns=names)
 
         # Subplots: Prices + Volume
-        comp_fig = make_subplots(rows=2, cols=1, shared_xaxes=True,
-                                 row_heights=[0.7, 0.3],
-                                 vertical_spacing=0.1,
-                                 subplot_titles=("Price Comparison", "Volume Comparison"))
-
-        # Price Lines
-        for col in compare_data.columns:
-            comp_fig.add_trace(go.Scatter(x=compare_data.index, y=compare_data[col],
-                                          mode="lines", name=col), row=1, col=1)
-
-        # Volume Bars (stacked per crypto)
-        for col in volume_data.columns:
-            comp_fig.add_trace(go.Bar(x=volume_data.index, y=volume_data[col],
-                                      name=f"{col} Volume", opacity=0.5), row=2, col=1)
-
-        comp_fig.update_layout(template="plotly_dark", height=700, title="Crypto Price & Volume Comparison")
-        st.plotly_chart(comp_fig, use_container_width=True)
+        from plotly.subplots import make_subplots  # slow to import; only this tab needs it
+        with profiling.stage("figure"):
+            comp_fig = make_subplots(rows=2, cols=1, shared_xaxes=True,
+                                     row_heights=[0.7, 0.3],
+                                     vertical_spacing=0.1,
+                                     subplot_titles=("Price Comparison", "Volume Comparison"))
+
+            # Price Lines
+            for col in compare_data.columns:
+                comp_fig.add_trace(decimate.scatter(x=compare_data.index, y=compare_data[col],
+                                              mode="lines", name=col), row=1, col=1)
+
+            # Volume Bars (stacked per crypto)
+            for col in volume_data.columns:
+                comp_fig.add_trace(decimate.bar(x=volume_data.index, y=volume_data[col],
+                                          name=f"{col} Volume", opacity=0.5), row=2, col=1)
+
+            comp_fig.update_layout(template="plotly_dark", height=700, title="Crypto Price & Volume Comparison")
+        profiling.plotly_chart(st, comp_fig, use_container_width=True)
     else:
-        st.info("ℹ️ Select other cryptos from the sidebar for comparison.")
+        st.info("ℹ️ Select other cryptos above for comparison.")
+
+requested = interval
+df, interval = load_data(crypto_symbol, period, requested)
+tab1, tab2 = st.tabs(["📊 Main Analysis", "📈 Comparison"])
+with tab1:
+    main_tab(df, interval)
+with tab2:
+    comparison_tab(df, interval)
+
+profiling.finish_run(st)
@@ -0,0 +1,292 @@
+import argparse
+import datetime
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+import indicators
+import memo
+import store
+
+# Next-day return forecasts for the whole ticker list, meant to run on a
+# schedule like precompute.py:
+#   python forecast.py --tickers ticker.csv --start 2022-01-01
+# Per symbol, in a process pool:
+#   features  lagged returns and the dashboards' indicators, one row per settled
+#             daily bar, stored beside the bars. New bars only extend the matrix:
+#             the EMAs carry on from their last stored value and the windows
+#             from the last TAIL closes.
+#   model     ridge regression of the next bar's return, kept as the running
+#             cross-product matrix of [features, 1, target]. Retraining only adds
+#             the rows for new bars, and the pooled model is the sum of every
+#             symbol's matrix.
+# The dashboards only read the stored models: predict() solves a small linear
+# system for the latest feature row, and nothing is trained inside a rerun.
+
+LAGS = 5
+EMAS = [12, 20, 26]
+VOL_WINDOW = 20
+TAIL = max(LAGS, VOL_WINDOW + 1)  # closes needed to extend the matrix
+WARMUP = 30  # first rows of a history left out while the EMAs settle
+ALPHA = 1e-3  # ridge penalty, relative to the mean feature variance
+MIN_ROWS = 60
+FEATURES = ([f"Return{k}" for k in range(1, LAGS + 1)]
+            + ["EMA Spread", "Close/EMA20", f"Volatility{VOL_WINDOW}"])
+TERMS = FEATURES + ["Intercept", "Target"]
+_cache = memo.LRU(256)
+
+
+# ---------------- Features ----------------
+# Feature rows for `close`; `previous` is the stored frame it extends (or None)
+def _frame(close, previous=None):
+    values = close.to_numpy(dtype="float64")
+    if previous is None or previous.empty:
+        tail = np.empty(0)
+        emas = {s: indicators.ema(values[:, None], s)[:, 0] for s in EMAS}
+    else:
+        tail = previous["Close"].to_numpy()[-TAIL:]
+        emas = {s: indicators.ema_from(values, s, previous[f"EMA{s}"].iloc[-1]) for s in EMAS}
+    full = np.concatenate([tail, values])
+    rets = indicators.returns(full)
+    vol = indicators.rolling_std(rets, VOL_WINDOW)
+    new = slice(len(tail), None)
+
+    frame = pd.DataFrame({"Close": values, **{f"EMA{s}": emas[s] for s in EMAS}}, index=close.index)
+    for k in range(1, LAGS + 1):
+        frame[f"Return{k}"] = np.r_[np.full(k - 1, np.nan), rets[:len(rets) - k + 1]][new]
+    frame["EMA Spread"] = emas[12] / emas[26] - 1.0
+    frame["Close/EMA20"] = values / emas[20] - 1.0
+    frame[f"Volatility{VOL_WINDOW}"] = vol[new]
+    if previous is None or previous.empty:
+        frame.iloc[:WARMUP, frame.columns.get_loc(FEATURES[0]):] = np.nan
+    return frame
+
+
+# Stored feature matrix extended with the settled bars after its last row
+def update_features(ticker, start, end):
+    stored = store.read_derived("1d", "features", ticker)
+    if stored is not None and list(stored.columns[-len(FEATURES):]) != FEATURES:
+        stored = None  # written with another feature set
+    if stored is not None and len(stored):
+        start = stored.index[-1] + pd.Timedelta(days=1)
+    close = store.read_history(ticker, start, end)["Close"].dropna()
+    if close.empty:
+        return stored if stored is not None else pd.DataFrame(columns=FEATURES, dtype="float64")
+    frame = _frame(close, stored)
+    if stored is not None and len(stored):
+        frame = pd.concat([stored, frame])
+    store.write_derived(frame, "1d", "features", ticker=ticker)
+    return frame
+
+
+# ---------------- Model ----------------
+class Ridge:
+    def __init__(self, zz=None, trained_until=None):
+        self.zz = np.zeros((len(TERMS), len(TERMS))) if zz is None else zz
+        self.trained_until = trained_until
+
+    @property
+    def rows(self):
+        return int(self.zz[-2, -2])
+
+    def partial_fit(self, X, y):
+        Z = np.column_stack([X, np.ones(len(X)), y])
+        self.zz += Z.T @ Z
+        return self
+
+    def merge(self, other):
+        self.zz += other.zz
+        return self
+
+    # Coefficients for FEATURES + ["Intercept"]; the intercept is not penalized
+    def coef(self, alpha=ALPHA):
+        if self.rows < MIN_ROWS:
+            return None
+        xx, xy = self.zz[:-1, :-1], self.zz[:-1, -1]
+        n, sums = self.zz[-2, -2], self.zz[-2, :-2]
+        variance = np.diag(xx)[:-1] / n - (sums / n) ** 2
+        penalty = np.r_[np.full(len(FEATURES), alpha * n * max(variance.mean(), 1e-12)), 0.0]
+        return np.linalg.solve(xx + np.diag(penalty), xy)
+
+
+def model_path(ticker=None):
+    return os.path.join(os.path.dirname(store.derived_path("1d", "forecast", ticker)), "forecast_model.json")
+
+
+def save_model(model, ticker=None):
+    path = model_path(ticker)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump({"terms": TERMS, "zz": model.zz.tolist(),
+                   "trained_until": model.trained_until.isoformat() if model.trained_until else None}, f)
+    os.replace(tmp, path)
+
+
+def load_model(ticker=None):
+    path = model_path(ticker)
+    if not os.path.exists(path):
+        return Ridge()
+    with open(path) as f:
+        saved = json.load(f)
+    if saved["terms"] != TERMS:
+        return Ridge()  # trained on another feature set
+    until = saved["trained_until"]
+    return Ridge(np.array(saved["zz"]), pd.Timestamp(until) if until else None)
+
+
+# Rows with every feature and a known next-bar return, after `after`
+def training_rows(frame, after=None):
+    target = frame["Close"].shift(-1) / frame["Close"] - 1.0
+    rows = frame[FEATURES].notna().all(axis=1) & target.notna()
+    if after is not None:
+        rows &= frame.index > after
+    return frame.loc[rows, FEATURES].to_numpy(), target[rows].to_numpy()
+
+
+# Warm start: only the rows that gained a target since the last run are added
+def train(ticker, frame):
+    model = load_model(ticker)
+    X, y = training_rows(frame, model.trained_until)
+    if len(y):
+        model.partial_fit(X, y)
+        model.trained_until = frame.index[-2]
+        save_model(model, ticker)
+    return model
+
+
+# ---------------- Prediction ----------------
+COLUMNS = ["Ticker", "For", "Close", "Predicted %", "Pooled %", "Signal"]
+
+
+# Predicted next-bar return in percent from the latest feature row (NaN without a model)
+def _percent(frame, coef):
+    if coef is None:
+        return np.nan
+    return float(np.r_[frame[FEATURES].iloc[-1].to_numpy(), 1.0] @ coef) * 100
+
+
+def _row(ticker, frame, coef, pooled=None):
+    predicted = _percent(frame, coef)
+    return {
+        "Ticker": ticker,
+        "For": (frame.index[-1] + pd.Timedelta(days=1)).date(),
+        "Close": frame["Close"].iloc[-1],
+        "Predicted %": predicted,
+        "Pooled %": _percent(frame, pooled),
+        "Signal": "UP" if predicted > 0 else "DOWN" if predicted < 0 else "-",
+    }
+
+
+def forecast_symbol(ticker, start, end):
+    t0 = time.perf_counter()
+    frame = update_features(ticker, start, end)
+    if len(frame) < 2:
+        return ticker, None, None, 0, time.perf_counter() - t0
+    model = train(ticker, frame)
+    return ticker, _row(ticker, frame, model.coef()), model, model.rows, time.perf_counter() - t0
+
+
+# Next-bar forecast from the stored features and model, cached until either file changes
+def predict(ticker):
+    features = store.derived_path("1d", "features", ticker)
+    paths = [features, model_path(ticker), model_path()]
+    stamps = tuple(os.stat(p).st_mtime_ns if os.path.exists(p) else None for p in paths)
+    key = (ticker, stamps)
+    found = _cache.get(key)
+    if found is not None:
+        return found
+    if stamps[0] is None or stamps[1] is None:
+        return None
+    frame = pd.read_parquet(features)
+    pooled = load_model().coef() if stamps[2] is not None else None
+    found = _row(ticker, frame, load_model(ticker).coef(), pooled)
+    _cache.put(key, found)
+    return found
+
+
+# (ticker, forecast_symbol's result or the exception it raised) as each finishes;
+# workers=1 runs in this process
+def _forecast_all(tickers, start, end, workers):
+    if workers == 1:
+        for ticker in tickers:
+            try:
+                yield ticker, forecast_symbol(ticker, start, end)
+            except Exception as e:
+                yield ticker, e
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(forecast_symbol, t, start, end): t for t in tickers}
+        for future in as_completed(futures):
+            try:
+                yield futures[future], future.result()
+            except Exception as e:
+                yield futures[future], e
+
+
+# Batch run over the ticker list; also retrains the pooled model and stores the table
+def run(tickers, start, end, workers=None):
+    rows, failed = [], {}
+    for ticker, result in _forecast_all(tickers, start, end, workers):
+        if isinstance(result, Exception):
+            failed[ticker] = str(result)
+            print(f"{ticker:>10}  FAILED  {result}")
+            continue
+        ticker, row, _, trained, seconds = result
+        print(f"{ticker:>10}  {trained:6d} rows  {seconds:6.2f}s")
+        if row is not None:
+            rows.append(row)
+    # Every stored model goes into the pooled one, including those of tickers
+    # that failed or had nothing new this run
+    stored = [load_model(t) for t in tickers if os.path.exists(model_path(t))]
+    pooled = Ridge()
+    for model in stored:
+        pooled.merge(model)
+    if stored:
+        pooled.trained_until = max(m.trained_until for m in stored)
+        save_model(pooled)
+    coef = pooled.coef()
+    for row in rows:
+        row["Pooled %"] = _percent(store.read_derived("1d", "features", row["Ticker"]), coef)
+    table = pd.DataFrame(rows, columns=COLUMNS)
+    table = table.sort_values("Predicted %", ascending=False, ignore_index=True)
+    if rows:
+        store.write_derived(table, "1d", "forecasts")
+    return table, failed
+
+
+# Table written by run(), with the time it was written (None if absent)
+def load_forecasts():
+    table = store.read_derived("1d", "forecasts")
+    if table is None:
+        return None, None
+    mtime = os.path.getmtime(store.derived_path("1d", "forecasts"))
+    return table, datetime.datetime.fromtimestamp(mtime)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train per-symbol forecast models and store next-day forecasts")
+    parser.add_argument("--tickers", default="ticker.csv", help="CSV whose first column lists tickers")
+    parser.add_argument("--start", default="2022-01-01")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    tickers = pd.read_csv(args.tickers).iloc[:, 0].dropna().unique().tolist()
+    # Today's bar is still forming; only settled bars are features or targets
+    end = store.to_utc(datetime.datetime.now(datetime.timezone.utc)).floor("D")
+    t0 = time.perf_counter()
+    table, failed = run(tickers, args.start, end, args.workers)
+    print(f"\n{len(tickers) - len(failed)}/{len(tickers)} symbols in {time.perf_counter() - t0:.1f}s"
+          f" -> {store.STORE_DIR}")
+    if not table.empty:
+        pd.set_option("display.width", 200)
+        print(table.round(4).to_string(index=False))
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
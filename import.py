@@ -1,35 +1,56 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
+import uuid
 from datetime import datetime
 
-# Load ticker data from CSV
-tickers_df = pd.read_csv("C:/Users/hardb/AppData/Local/Microsoft/Windows/INetCache/IE/FHMFEBM2/Tickers[1].csv")
-tickers = tickers_df.iloc[:, 0].dropna().unique().tolist()
+import indicators
+import live
+import metadata
+import profiling
+import scheduler
+import screener
+import store
+
+# Load ticker data from CSV, once per server process
+@st.cache_resource
+def load_tickers():
+    tickers_df = pd.read_csv("C:/Users/hardb/AppData/Local/Microsoft/Windows/INetCache/IE/FHMFEBM2/Tickers[1].csv")
+    tickers = tuple(tickers_df.iloc[:, 0].dropna().unique())
+    metadata.cache().prefetch("currency", tickers)
+    return tickers
+
+# seaborn and matplotlib take seconds to import, so they are loaded by the first chart
+def plotting():
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+    return plt, sns
 
 # Streamlit setup
 st.set_page_config(page_title="Stock Analyzer", layout="wide")
+profiling.start_run("import", st)
+tickers = load_tickers()
 
 # Fetch stock data
+@profiling.timed("fetch_stock_data", cached=False)
 def fetch_stock_data(ticker, start, end):
-    data = yf.download(ticker, start=start, end=end)
+    data = store.read_history(ticker, start, end, interval="1d")
     if not data.empty:
-        data['Standard Deviation'] = data['Close'].rolling(window=20).std()
-        data.to_csv(f"data_{ticker}.csv")
+        data['Standard Deviation'] = indicators.for_bars(data, ["STD20"], ticker)["STD20"]
     return data
 
 # Plot graph
 def plot_graph(data, metric, title, background_image=None):
-    fig, ax = plt.subplots(figsize=(12, 6))
-    sns.lineplot(x=data.index, y=data[metric].values.flatten(), ax=ax)
-    ax.set_title(title)
-    st.pyplot(fig)
+    with profiling.stage("figure"):
+        plt, sns = plotting()
+        fig, ax = plt.subplots(figsize=(12, 6))
+        sns.lineplot(x=data.index, y=data[metric].values.flatten(), ax=ax)
+        ax.set_title(title)
+    with profiling.stage("pyplot"):
+        st.pyplot(fig)
 
 # EMA strategy
-def ema_strategy(data):
-    data['EMA20'] = data['Close'].ewm(span=20, adjust=False).mean()
+def ema_strategy(data, ticker):
+    data['EMA20'] = indicators.for_bars(data, ["EMA20"], ticker)["EMA20"]
     data['Signal'] = data['Close'].values > data['EMA20'].values  # avoid misalignment
     return data
 
@@ -44,26 +65,47 @@ def load_logo(currency):
 
 # Get currency
 def get_currency(ticker):
-    try:
-        stock = yf.Ticker(ticker)
-        info = stock.info
-        return info.get('currency', 'USD')
-    except:
-        return 'USD'
+    return metadata.cache().currency(ticker)
 
-# Sidebar
-window = st.sidebar.radio("Select Window", [
-    "1. Single Stock Chart",
-    "2. Compare Two Stocks",
-    "3. EMA Buy Signal",
-    "4. Live Data"
-])
+@st.cache_data(ttl=60)
+def fetch_fallback(stock):
+    return scheduler.call("yahoo", scheduler.LIVE, scheduler.yahoo().Ticker(stock).history,
+                          period="5d", interval="1h")['Close']
 
-start_date = st.sidebar.date_input("Start Date", datetime(2022, 1, 1))
-end_date = st.sidebar.date_input("End Date", datetime.today())
+@st.cache_data(ttl=300)
+def run_screener(tickers, start, end):
+    return screener.screen(tickers, start, end)
+
+def session_id():
+    if "session_id" not in st.session_state:
+        st.session_state["session_id"] = uuid.uuid4().hex
+    return st.session_state["session_id"]
+
+# Live panel reading the shared per-symbol feed; reruns on its own every second
+@st.fragment(run_every=1)
+def live_panel(stock):
+    try:
+        feed = live.hub().subscribe(session_id(), stock, interval="1m")
+        version, times, prices, _, _ = feed.snapshot()
+        if feed.error is not None and not version:
+            raise feed.error
+        if version:
+            live_data = pd.Series(prices, index=times, name="Close")
+        elif feed.polls:
+            live_data = fetch_fallback(stock)
+            st.warning("⚠️ Showing fallback data (1h interval, 5 days). Market might be closed or 1m data unavailable.")
+        else:
+            st.info("Connecting to live feed...")
+            return
+        st.subheader(f"Live Data for {stock}")
+        st.line_chart(live_data)
+    except Exception as e:
+        st.error(f"❌ Could not fetch live data. Reason: {e}")
 
 # Window 1: Single Stock Chart
-if window.startswith("1"):
+@st.fragment
+@profiling.fragment("import")
+def single_window(tickers, start_date, end_date):
     st.header("📈 Single Stock Analysis")
     col1, col2 = st.columns(2)
     with col1:
@@ -83,8 +125,11 @@ if window.startswith("1"):
         else:
             st.error("No data found for selected stock.")
 
+
 # Window 2: Compare Two Stocks
-elif window.startswith("2"):
+@st.fragment
+@profiling.fragment("import")
+def compare_window(tickers, start_date, end_date):
     st.header("📊 Compare Two Stocks")
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -102,6 +147,7 @@ elif window.startswith("2"):
         combined_df.reset_index(inplace=True)
         melted = combined_df.melt(id_vars='Date', var_name='Stock', value_name='Value')
 
+        plt, sns = plotting()
         fig, ax = plt.subplots(figsize=(12, 6))
         sns.lineplot(data=melted, x='Date', y='Value', hue='Stock', ax=ax)
         ax.set_title(f"{metric} Comparison")
@@ -109,14 +155,17 @@ elif window.startswith("2"):
     else:
         st.warning("Choose different stocks to compare.")
 
+
 # Window 3: EMA Buy Signal
-elif window.startswith("3"):
+@st.fragment
+@profiling.fragment("import")
+def ema_window(tickers, start_date, end_date):
     st.header("📉 EMA Buy Signal Recommendation")
     stock = st.selectbox("Choose a Stock", tickers, key="ema_stock")
     if stock:
         df = fetch_stock_data(stock, start_date, end_date)
         if not df.empty:
-            df = ema_strategy(df)
+            df = ema_strategy(df, stock)
             currency = get_currency(stock)
             logo_url = load_logo(currency)
             if logo_url:
@@ -131,17 +180,47 @@ elif window.startswith("3"):
         else:
             st.error("No data found.")
 
+
 # Window 4: Live Data
-elif window.startswith("4"):
+@st.fragment
+def live_window(tickers, start_date, end_date):
     st.header("🟢 Live Stock Data")
     stock = st.selectbox("Choose a Stock", tickers, key="live")
+    if st.session_state.get("live_stock") not in (None, stock):
+        live.hub().unsubscribe(session_id(), st.session_state["live_stock"])
+    st.session_state["live_stock"] = stock
     if stock:
-        try:
-            live_data = yf.Ticker(stock).history(period="1d", interval="1m")
-            if live_data.empty:
-                live_data = yf.Ticker(stock).history(period="5d", interval="1h")
-                st.warning("⚠️ Showing fallback data (1h interval, 5 days). Market might be closed or 1m data unavailable.")
-            st.subheader(f"Live Data for {stock}")
-            st.line_chart(live_data['Close'])
-        except Exception as e:
-            st.error(f"❌ Could not fetch live data. Reason: {e}")
+        live_panel(stock)
+
+
+# Window 5: Screener
+@st.fragment
+@profiling.fragment("import")
+def screener_window(tickers, start_date, end_date):
+    st.header("🔎 EMA Screener")
+    if st.button("Run Screener"):
+        table, errors = run_screener(tickers, start_date, end_date)
+        if table.empty:
+            st.error("No data found.")
+        else:
+            st.dataframe(table, use_container_width=True, hide_index=True)
+        if errors:
+            st.caption(f"Skipped {len(errors)} tickers with missing or short history.")
+
+# Sidebar
+window = st.sidebar.radio("Select Window", [
+    "1. Single Stock Chart",
+    "2. Compare Two Stocks",
+    "3. EMA Buy Signal",
+    "4. Live Data",
+    "5. Screener"
+])
+
+start_date = st.sidebar.date_input("Start Date", datetime(2022, 1, 1))
+end_date = st.sidebar.date_input("End Date", datetime.today())
+
+# Each window is a fragment: its own widgets rerun that window only
+WINDOWS = [single_window, compare_window, ema_window, live_window, screener_window]
+WINDOWS[int(window[0]) - 1](tickers, start_date, end_date)
+
+profiling.finish_run(st)
@@ -0,0 +1,171 @@
+import re
+
+import numpy as np
+import pandas as pd
+
+import memo
+import profiling
+import store
+
+# Shared indicator engine. Indicators are named like the DataFrame columns the
+# apps use ("EMA12", "STD5", "Returns", "Volatility20") and computed together
+# over a 2-D (time x symbol) close array, matching the pandas formulas:
+#   EMAn         close.ewm(span=n, adjust=False).mean() on a gap-free column;
+#                gaps inside a column are forward-filled first, where pandas
+#                would instead decay the EMA across them
+#   STDn         close.rolling(window=n).std()
+#   Returns      close.pct_change()
+#   Volatilityn  close.pct_change().rolling(window=n).std()
+
+_NAME = re.compile(r"(EMA|STD|Returns|Volatility)(\d*)")
+_cache = memo.LRU(256)
+
+
+def parse(name):
+    m = _NAME.fullmatch(name)
+    if m is None:
+        raise ValueError(f"Unknown indicator: {name}")
+    kind, n = m.groups()
+    if kind != "Returns" and not n:
+        raise ValueError(f"Indicator {name} needs a window, e.g. {kind}20")
+    return kind, int(n) if n else None
+
+
+# EMA with adjust=False down every column at once. Each column starts at its
+# first valid value; gaps inside a column are forward-filled first.
+def ema(values, span):
+    from scipy.signal import lfilter  # slow to import, so only on first use
+    alpha = 2.0 / (span + 1.0)
+    values = pd.DataFrame(values).ffill().to_numpy()
+    out = np.full(values.shape, np.nan)
+    valid = ~np.isnan(values)
+    first = np.where(valid.any(axis=0), valid.argmax(axis=0), len(values))
+    for start in np.unique(first[first < len(values)]):
+        cols = first == start
+        x = values[start:, cols]
+        zi = (1.0 - alpha) * x[:1]
+        out[start:, cols] = lfilter([alpha], [1.0, alpha - 1.0], x, axis=0, zi=zi)[0]
+    return out
+
+
+# EMA of a 1-D `values` carrying on from `last`, the EMA of the bar before values[0]
+def ema_from(values, span, last):
+    from scipy.signal import lfilter
+    alpha = 2.0 / (span + 1.0)
+    return lfilter([alpha], [1.0, alpha - 1.0], values, zi=[(1.0 - alpha) * last])[0]
+
+
+# Sample std (ddof=1) over trailing windows; NaN until the window is full, like pandas
+def rolling_std(values, window):
+    out = np.full(values.shape, np.nan)
+    if len(values) >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)
+        out[window - 1:] = windows.std(axis=-1, ddof=1)
+    return out
+
+
+def returns(values):
+    out = np.full(values.shape, np.nan)
+    out[1:] = values[1:] / values[:-1] - 1.0
+    return out
+
+
+# All requested indicators in one pass; intermediates (returns) are shared
+def compute(values, names):
+    values = np.asarray(values, dtype="float64")
+    if values.ndim == 1:
+        values = values[:, None]
+    results = {}
+    rets = None
+    for name in dict.fromkeys(names):
+        kind, n = parse(name)
+        if kind in ("Returns", "Volatility") and rets is None:
+            rets = returns(values)
+        if kind == "EMA":
+            results[name] = ema(values, n)
+        elif kind == "STD":
+            results[name] = rolling_std(values, n)
+        elif kind == "Returns":
+            results[name] = rets
+        else:
+            results[name] = rolling_std(rets, n)
+    return results
+
+
+# Memoized per caller label (symbol / interval), data fingerprint and indicator name
+def _memoized(label, frame, names):
+    data = memo.fingerprint(frame)
+    keys = {name: (label, data, name) for name in names}
+    hits = _cache.get_many(keys.values())
+    found = {name: hits[k] for name, k in keys.items() if k in hits}
+    missing = [name for name in names if name not in found]
+    profiling.count("indicators", hit=not missing)
+    if missing:
+        with profiling.stage("indicators", rows=len(frame), names=",".join(missing)):
+            computed = compute(frame.to_numpy(), missing)
+        for arr in computed.values():
+            arr.flags.writeable = False
+        _cache.put_many((keys[name], arr) for name, arr in computed.items())
+        found.update(computed)
+    return found
+
+
+# Indicators for one symbol as a DataFrame with one column per name
+def for_series(close, names, label=None):
+    if isinstance(close, pd.DataFrame):
+        close = close.iloc[:, 0]
+    frame = close.astype("float64").to_frame()
+    arrays = _memoized(label, frame, names)
+    return pd.DataFrame({name: arrays[name][:, 0] for name in names},
+                        index=close.index, copy=True)
+
+
+# Indicators for a close panel (time x symbol): {name: DataFrame with the panel's shape}
+def for_panel(close, names, label=None):
+    frame = close.astype("float64")
+    arrays = _memoized(label, frame, names)
+    return {name: pd.DataFrame(arrays[name], index=close.index, columns=close.columns, copy=True)
+            for name in names}
+
+
+# ---------------- Stored indicators ----------------
+# Indicators for the bars after the first `k`, given their values over those
+# k bars: EMAs carry on from their last value, windows need the last n closes
+def extend(close, head, names):
+    k, new = len(head), len(close) - len(head)
+    out = {}
+    for name in names:
+        kind, n = parse(name)
+        if kind == "EMA":
+            tail = ema_from(close[k:], n, head[name].iloc[-1])
+        elif kind == "STD":
+            tail = rolling_std(close[max(0, k - n + 1):], n)[-new:]
+        elif kind == "Returns":
+            tail = returns(close[k - 1:])[1:]
+        else:
+            tail = rolling_std(returns(close[max(0, k - n):]), n)[-new:]
+        out[name] = np.r_[head[name].to_numpy(), tail]
+    return out
+
+
+# Indicator columns for a symbol's bars (`df` from store.read_history). The
+# columns precompute.py stored are used for the leading bars whose closes are
+# unchanged, so usually only the bars since the last precompute run (today's
+# forming bar) are computed here; anything else falls back to for_series.
+def for_bars(df, names, ticker, interval="1d"):
+    close = df["Close"].to_numpy(dtype="float64")
+    stored = store.read_derived(interval, "indicators", ticker)
+    k = 0
+    if (stored is not None and len(close) and not np.isnan(close).any()
+            and {"Close", *names} <= set(stored.columns)):
+        stored = stored.loc[:df.index[-1]]
+        if stored.index.equals(df.index[:len(stored)]):
+            same = stored["Close"].to_numpy() == close[:len(stored)]
+            k = len(stored) if same.all() else int(same.argmin())
+    profiling.count("stored_indicators", hit=k == len(close) and k > 0)
+    if k == 0:
+        return for_series(df["Close"], names, label=ticker)
+    head = stored.iloc[:k]
+    if k == len(close):
+        return head[names].copy()
+    return pd.DataFrame(extend(close, head, names), index=df.index)[names]
@@ -0,0 +1,129 @@
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import memo
+import scaling
+
+# Gaussian KDE on a fixed grid, for the before/after distribution plots.
+# Each column is linearly binned onto GRID points, then convolved with the
+# kernel by FFT: O(n + g log g) instead of sns.kdeplot's O(n * g), so whole
+# files can be plotted. Bandwidth (Scott's rule) and the grid's reach past the
+# data (CUT bandwidths) match sns.kdeplot's defaults.
+# A rescaled column (x - center) / scale has exactly the rescaled density, so
+# "after" plots come from Density.affine() without binning the data again.
+
+GRID = 1024
+CUT = 3
+_cache = memo.LRU(64)
+
+
+class Density:
+    def __init__(self, grid, values, n, bandwidth):
+        self.grid = grid
+        self.values = values
+        self.n = n
+        self.bandwidth = bandwidth
+
+    # Density of (x - center) / scale, for scale > 0
+    def affine(self, center, scale):
+        return Density((self.grid - center) / scale, self.values * scale, self.n, self.bandwidth / scale)
+
+
+# Per column: count, mean, M2 (Chan et al. merge of per-chunk moments), min, max
+def _moments(chunks):
+    n = mean = m2 = lo = hi = None
+    for X in chunks:
+        ok = ~np.isnan(X)
+        cn = ok.sum(axis=0)
+        filled = np.where(ok, X, 0.0)
+        cmean = filled.sum(axis=0) / np.maximum(cn, 1)
+        cm2 = (np.where(ok, X - cmean, 0.0) ** 2).sum(axis=0)
+        cmin = np.where(ok, X, np.inf).min(axis=0)
+        cmax = np.where(ok, X, -np.inf).max(axis=0)
+        if n is None:
+            n, mean, m2, lo, hi = cn, cmean, cm2, cmin, cmax
+            continue
+        total = n + cn
+        delta = cmean - mean
+        mean = mean + delta * cn / np.maximum(total, 1)
+        m2 = m2 + cm2 + delta ** 2 * n * cn / np.maximum(total, 1)
+        n, lo, hi = total, np.minimum(lo, cmin), np.maximum(hi, cmax)
+    return n, mean, m2, lo, hi
+
+
+# Linear binning: each value splits its weight between the two nearest grid points
+def _bin(values, lo, dx, gridsize):
+    values = values[~np.isnan(values)]
+    pos = (values - lo) / dx
+    i = np.clip(np.floor(pos).astype(np.int64), 0, gridsize - 2)
+    frac = pos - i
+    return (np.bincount(i, 1 - frac, gridsize) + np.bincount(i + 1, frac, gridsize))
+
+
+def _smooth(counts, n, dx, bandwidth):
+    reach = min(int(math.ceil(4 * bandwidth / dx)), len(counts) - 1)
+    offsets = np.arange(-reach, reach + 1) * dx
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2)
+    kernel /= kernel.sum() * dx  # integrates to 1 on the grid, however coarse
+    size = 1 << (len(counts) + 2 * reach - 1).bit_length()
+    out = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+    return np.maximum(out[reach:reach + len(counts)], 0.0) / n
+
+
+# Densities for every column of the blocks chunks() yields (called twice: moments, then binning).
+# Constant columns get None, as sns.kdeplot skips them.
+def from_chunks(chunks, gridsize=GRID, workers=None):
+    n, mean, m2, lo, hi = _moments(chunks())
+    std = np.sqrt(m2 / np.maximum(n - 1, 1))
+    bandwidth = std * np.maximum(n, 1) ** -0.2
+    columns = [c for c in range(len(n)) if n[c] > 1 and bandwidth[c] > 0]
+    start = {c: lo[c] - CUT * bandwidth[c] for c in columns}
+    dx = {c: (hi[c] - lo[c] + 2 * CUT * bandwidth[c]) / (gridsize - 1) for c in columns}
+    counts = {c: np.zeros(gridsize) for c in columns}
+
+    with ThreadPoolExecutor(max_workers=workers or min(len(columns), os.cpu_count()) or 1) as pool:
+        for X in chunks():
+            binned = pool.map(lambda c: _bin(X[:, c], start[c], dx[c], gridsize), columns)
+            for c, b in zip(columns, binned):
+                counts[c] += b
+        smoothed = dict(zip(columns, pool.map(
+            lambda c: _smooth(counts[c], n[c], dx[c], bandwidth[c]), columns)))
+
+    return [Density(start[c] + dx[c] * np.arange(gridsize), smoothed[c], int(n[c]), bandwidth[c])
+            if c in smoothed else None for c in range(len(n))]
+
+
+def for_array(X, gridsize=GRID, workers=None):
+    X = np.asarray(X, dtype="float64")
+    if X.ndim == 1:
+        X = X[:, None]
+    return from_chunks(lambda: [X], gridsize, workers)
+
+
+# Whole-file densities by column name, read in chunks; cached per column until the file changes
+def for_csv(path, columns=None, gridsize=GRID, workers=None):
+    columns = list(columns or scaling.csv_columns(path))
+    info = os.stat(path)
+    keys = {c: (os.path.abspath(path), info.st_mtime_ns, info.st_size, c, gridsize) for c in columns}
+    hits = _cache.get_many(keys.values())
+    found = {c: hits[k] for c, k in keys.items() if k in hits}
+    missing = [c for c in columns if c not in found]
+    if missing:
+        computed = from_chunks(lambda: scaling.read_chunks(path, missing), gridsize, workers)
+        _cache.put_many((keys[c], density) for c, density in zip(missing, computed))
+        found.update(zip(missing, computed))
+    return {c: found[c] for c in columns}
+
+
+# Drawn like sns.kdeplot(fill=True)
+def plot(ax, density, color, fill=True):
+    ax.set_ylabel("Density")
+    if density is None:
+        return
+    ax.plot(density.grid, density.values, color=color)
+    if fill:
+        ax.fill_between(density.grid, density.values, color=color, alpha=0.25, linewidth=0)
+    ax.set_ylim(bottom=0)
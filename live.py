@@ -0,0 +1,239 @@
+import datetime
+import threading
+import time
+
+import numpy as np
+
+import scheduler
+import store
+import streaming
+
+# Live streaming helpers: poll only the tail of the intraday series and keep
+# it in a fixed-size ring buffer, so each tick costs the same all day.
+
+
+class RingBuffer:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.times = np.empty(capacity, dtype="datetime64[ns]")
+        self.values = np.empty(capacity, dtype="float64")
+        self.head = 0  # next slot to write
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def last(self):
+        if not self.size:
+            return None
+        i = (self.head - 1) % self.capacity
+        return self.times[i], self.values[i]
+
+    # Drop trailing entries at or after `t`; the still-forming bar comes back on every poll
+    def _truncate_from(self, t):
+        while self.size and self.times[(self.head - 1) % self.capacity] >= t:
+            self.head = (self.head - 1) % self.capacity
+            self.size -= 1
+
+    def extend(self, times, values):
+        times = np.asarray(times, dtype="datetime64[ns]")[-self.capacity:]
+        values = np.asarray(values, dtype="float64")[-self.capacity:]
+        if not len(times):
+            return
+        self._truncate_from(times[0])
+        slots = (self.head + np.arange(len(times))) % self.capacity
+        self.times[slots] = times
+        self.values[slots] = values
+        self.head = (self.head + len(times)) % self.capacity
+        self.size = min(self.size + len(times), self.capacity)
+
+    # Chronological (times, values); plain views unless the buffer has wrapped
+    def view(self):
+        start = (self.head - self.size) % self.capacity
+        if start + self.size <= self.capacity:
+            return self.times[start:start + self.size], self.values[start:start + self.size]
+        order = np.r_[start:self.capacity, 0:self.head]
+        return self.times[order], self.values[order]
+
+
+# Bars from `since` onwards (inclusive, so the forming bar is refreshed)
+def fetch_tail(ticker, since, interval="1m"):
+    df = scheduler.call("yahoo", scheduler.LIVE, scheduler.yahoo().download,
+                        tickers=ticker, start=since, interval=interval, progress=False)
+    if df.empty:
+        return df
+    return store.normalize_bars(df, interval)
+
+
+class TailPoller:
+    def __init__(self, ticker, start, interval="1m", capacity=1440, overlays=(), crossover=None):
+        self.ticker = ticker
+        self.interval = interval
+        self.since = start
+        self.buffer = RingBuffer(capacity)
+        # Indicator overlays ("EMA12", "STD5") advanced in O(1) per bar
+        self.streams = {name: streaming.make(name) for name in overlays}
+        self.overlays = {name: RingBuffer(capacity) for name in overlays}
+        # (fast, slow) EMA spans of the BUY/SELL rule, tracked bar by bar
+        self.crossover = streaming.Crossover(*crossover) if crossover else None
+
+    def _advance(self, times, closes):
+        streams = dict(self.streams)
+        if self.crossover is not None:
+            streams[None] = self.crossover
+        if not len(self.buffer):
+            out = {name: s.seed(closes) for name, s in streams.items()}
+        else:
+            last_time = self.buffer.last()[0]
+            out = {name: np.empty(len(closes)) for name in self.streams}
+            for i, (t, x) in enumerate(zip(times, closes)):
+                for name, s in streams.items():
+                    value = s.revise(x) if t == last_time else s.update(x)
+                    if name is not None:
+                        out[name][i] = value
+        out.pop(None, None)
+        return out
+
+    # Fetch new bars; returns True when the buffer changed
+    def poll(self):
+        bars = fetch_tail(self.ticker, self.since, self.interval)
+        if not bars.empty:
+            bars = bars.dropna(subset=["Close"])
+        if bars.empty:
+            return False
+        times = bars.index.tz_convert(None).to_numpy(dtype="datetime64[ns]")
+        closes = bars["Close"].to_numpy(dtype="float64")
+        last = self.buffer.last()
+        if last is not None:
+            # Anything older than the bar we already hold was seen before
+            keep = times >= last[0]
+            times, closes = times[keep], closes[keep]
+            if not len(times):
+                return False
+        for name, values in self._advance(times, closes).items():
+            self.overlays[name].extend(times, values)
+        self.buffer.extend(times, closes)
+        self.since = bars.index[-1]
+        after = self.buffer.last()
+        return last is None or last[0] != after[0] or last[1] != after[1]
+
+    def overlay_view(self):
+        return {name: buf.view()[1] for name, buf in self.overlays.items()}
+
+    # (signal, whether the latest bar flipped it); (None, False) without a crossover
+    def signal(self):
+        if self.crossover is None:
+            return None, False
+        return self.crossover.signal, self.crossover.crossed
+
+
+def _midnight_today():
+    return datetime.datetime.combine(datetime.date.today(), datetime.time(0, 0))
+
+
+# One background poller per (symbol, interval), shared by every subscribed session.
+# Readers get copied snapshots tagged with a version that bumps on each change:
+# (version, times, closes, overlays, (signal, crossed)).
+class SymbolFeed(threading.Thread):
+    def __init__(self, hub, key, start, every, overlays=(), crossover=None):
+        super().__init__(name=f"live-{key[0]}-{key[1]}", daemon=True)
+        self.hub = hub
+        self.key = key
+        self.every = every
+        self.poller = TailPoller(key[0], start, interval=key[1], overlays=overlays, crossover=crossover)
+        self.version = 0
+        self.polls = 0
+        self.error = None
+        self._lock = threading.Lock()
+        self._snapshot = (np.empty(0, dtype="datetime64[ns]"), np.empty(0), {}, (None, False))
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while self.hub._keep_alive(self):
+            try:
+                if self.poller.poll():
+                    times, values = self.poller.buffer.view()
+                    overlays = {n: v.copy() for n, v in self.poller.overlay_view().items()}
+                    with self._lock:
+                        self._snapshot = (times.copy(), values.copy(), overlays, self.poller.signal())
+                        self.version += 1
+                self.error = None
+            except Exception as e:
+                self.error = e
+            self.polls += 1
+            if self._stop_event.wait(self.every):
+                break
+
+    def stop(self):
+        self._stop_event.set()
+
+    def snapshot(self):
+        with self._lock:
+            return (self.version,) + self._snapshot
+
+
+# Sessions subscribe with a lease they renew on every rerun; a feed stops once
+# its last lease is released or expires (e.g. the browser tab was closed).
+class LiveHub:
+    def __init__(self, every=1.0, lease=15.0, overlays=("EMA12", "EMA26", "STD5"), crossover=(12, 26)):
+        self.every = every
+        self.overlays = overlays
+        self.crossover = crossover
+        self.lease = lease
+        self._lock = threading.Lock()
+        self._feeds = {}
+        self._subscribers = {}
+
+    def subscribe(self, session_id, ticker, interval="1m", start=None):
+        key = (ticker, interval)
+        with self._lock:
+            self._subscribers.setdefault(key, {})[session_id] = time.monotonic()
+            feed = self._feeds.get(key)
+            if feed is None or not feed.is_alive():
+                feed = SymbolFeed(self, key, start or _midnight_today(), self.every, self.overlays,
+                                  self.crossover)
+                self._feeds[key] = feed
+                feed.start()
+            return feed
+
+    def unsubscribe(self, session_id, ticker, interval="1m"):
+        key = (ticker, interval)
+        with self._lock:
+            self._subscribers.get(key, {}).pop(session_id, None)
+            if not self._subscribers.get(key):
+                self._subscribers.pop(key, None)
+                feed = self._feeds.pop(key, None)
+                if feed is not None:
+                    feed.stop()
+
+    # Called by a feed before each poll: drops expired leases, False once nobody is left
+    def _keep_alive(self, feed):
+        now = time.monotonic()
+        with self._lock:
+            subs = self._subscribers.get(feed.key, {})
+            for session_id, seen in list(subs.items()):
+                if now - seen > self.lease:
+                    del subs[session_id]
+            if subs and self._feeds.get(feed.key) is feed:
+                return True
+            if self._feeds.get(feed.key) is feed:
+                del self._feeds[feed.key]
+                self._subscribers.pop(feed.key, None)
+            return False
+
+    def stats(self):
+        with self._lock:
+            return {f"{t} {i}": len(s) for (t, i), s in self._subscribers.items()}
+
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+# Process-wide hub shared by all Streamlit sessions
+def hub():
+    global _hub
+    with _hub_lock:
+        if _hub is None:
+            _hub = LiveHub()
+        return _hub
@@ -0,0 +1,119 @@
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pv
+
+import store
+
+# Loader for the two CSV layouts found in this repo:
+#   flat  - Ticker.history() dumps (BNB-USD.csv, SOL-USD.csv, DOGE-USD.csv)
+#   multi - yf.download() dumps with Price / Ticker / Date header rows
+#           (BTC-USD.csv, ETH-USD.csv, data_AAPL.csv, data/BTC-USD.csv)
+
+BUNDLED = [
+    "BNB-USD.csv", "SOL-USD.csv", "DOGE-USD.csv", "BTC-USD.csv", "ETH-USD.csv",
+    "data_AAPL.csv", "data_AMZN.csv", "data_MSFT.csv", "data_NVDA.csv",
+    "data_PLTR.csv", "data_BTC-USD.csv", "data/BTC-USD.csv", "data/ETH-USD.csv",
+]
+
+
+def _head(path, n=3):
+    with open(path) as f:
+        return [f.readline().rstrip("\r\n").split(",") for _ in range(n)]
+
+
+def detect_layout(path):
+    first, second, third = _head(path)
+    if first[0] == "Price" and second[0] == "Ticker" and third[0] == "Date":
+        return "multi"
+    if first[0] == "Date":
+        return "flat"
+    raise ValueError(f"Unrecognised CSV layout in {path}")
+
+
+# Symbol from the Ticker header row, or from the file name for flat dumps
+def csv_ticker(path):
+    if detect_layout(path) == "multi":
+        second = _head(path, 2)[1]
+        names = [t for t in second[1:] if t]
+        if names:
+            return names[0]
+    name = os.path.splitext(os.path.basename(path))[0]
+    return name[len("data_"):] if name.startswith("data_") else name
+
+
+# Parsed by pyarrow with fixed column types, so no per-read type inference
+def load_csv(path):
+    layout = detect_layout(path)
+    columns = _head(path, 1)[0][1:]
+    # Flat dumps carry a "+00:00" offset, multi-header dumps are plain dates
+    types = {"Date": pa.timestamp("ns", "UTC") if layout == "flat" else pa.timestamp("ns")}
+    types.update({c: pa.int64() if c == "Volume" else pa.float32() for c in columns})
+    table = pv.read_csv(
+        path,
+        read_options=pv.ReadOptions(skip_rows=3 if layout == "multi" else 1,
+                                    column_names=["Date"] + columns),
+        convert_options=pv.ConvertOptions(column_types=types),
+    )
+    df = table.to_pandas().set_index("Date")
+    if df.index.tz is None:
+        df.index = df.index.tz_localize("UTC")
+    return df
+
+
+# One-shot conversion to Parquet next to the CSV (or to `out`)
+def convert(path, out=None):
+    out = out or os.path.splitext(path)[0] + ".parquet"
+    load_csv(path).to_parquet(out)
+    return out
+
+
+# Bulk-load a CSV dump into the local store and mark its span as covered
+def ingest(path, ticker=None, interval="1d"):
+    df = load_csv(path)
+    if df.empty:
+        return 0
+    ticker = ticker or csv_ticker(path)
+    bars = store.normalize_bars(df, interval)
+    store.write_bars(ticker, interval, bars)
+    store.mark_covered(ticker, interval, bars.index[0], bars.index[-1] + store.bar_delta(interval))
+    return len(bars)
+
+
+def _best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+# Timing comparison against plain pd.read_csv on the bundled files
+def compare(paths=BUNDLED, repeat=5):
+    rows = []
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        parquet = convert(path, os.path.join(tempfile.gettempdir(), os.path.basename(path) + ".parquet"))
+        rows.append({
+            "file": path,
+            "layout": detect_layout(path),
+            "rows": len(load_csv(path)),
+            "read_csv_ms": _best_of(lambda: pd.read_csv(path), repeat) * 1000,
+            "load_csv_ms": _best_of(lambda: load_csv(path), repeat) * 1000,
+            "parquet_ms": _best_of(lambda: pd.read_parquet(parquet), repeat) * 1000,
+            "csv_kb": os.path.getsize(path) / 1024,
+            "parquet_kb": os.path.getsize(parquet) / 1024,
+        })
+        os.remove(parquet)
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    pd.set_option("display.width", 200)
+    print(compare(sys.argv[1:] or BUNDLED).round(2).to_string(index=False))
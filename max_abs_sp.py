@@ -1,36 +1,42 @@
-import pandas as pd
-import seaborn as sns
+import os
+import sys
 import matplotlib.pyplot as plt
-from sklearn.preprocessing import MaxAbsScaler
-from scipy import sparse
 
-# Step 1: Load the uploaded dataset
-df = pd.read_csv("C:/Users/hardb/Downloads/archive (3)/max_abs_sparse_data.csv")
+import kde
+import scaling
 
-# Step 2: Apply MaxAbsScaler to numeric columns
-scaler = MaxAbsScaler()
-scaled_data = scaler.fit_transform(df)
-scaled_df = pd.DataFrame(scaled_data, columns=df.columns)
+# Step 1: Dataset path (or pass one on the command line)
+path = sys.argv[1] if len(sys.argv) > 1 else "C:/Users/hardb/Downloads/archive (3)/max_abs_sparse_data.csv"
+out_dir = os.path.splitext(path)[0] + "_scaled"
 
-# Step 3: Convert to sparse matrix
-sparse_matrix = sparse.csr_matrix(scaled_data)
-print("Sparse matrix shape:", sparse_matrix.shape)
-print("Sparsity: {:.2f}%".format(100 * (1.0 - sparse_matrix.count_nonzero() / sparse_matrix.size)))
+# Step 2: Fit MaxAbsScaler chunk by chunk (partial_fit)
+scaler = scaling.fit_maxabs(path)
+
+# Step 3: Scale each chunk straight to a sparse matrix, written to out_dir
+rows, cols, nnz = scaling.save_blocks(scaling.maxabs_sparse(path, scaler), out_dir)
+print("Sparse matrix shape:", (rows, cols))
+print("Sparsity: {:.2f}%".format(100 * (1.0 - nnz / (rows * cols))))
+print("Saved to", out_dir)
+
+# Step 4: Plot before and after (side-by-side) over the whole file.
+# Columns are binned in parallel; each scaled density is its original one rescaled.
+densities = kde.for_csv(path)
 
-# Step 4: Plot before and after (side-by-side)
 plt.figure(figsize=(18, 12))
 
-for i, column in enumerate(df.columns):
+for i, (column, density) in enumerate(densities.items()):
     plt.subplot(4, 4, 2*i + 1)
-    sns.kdeplot(df[column], fill=True, color='blue')
+    kde.plot(plt.gca(), density, color='blue')
     plt.title(f"Before Scaling: {column}")
+    plt.xlabel(column)
     plt.grid(True)
 
     plt.subplot(4, 4, 2*i + 2)
-    sns.kdeplot(scaled_df[column], fill=True, color='green')
+    kde.plot(plt.gca(), density and density.affine(0.0, scaler.scale_[i]), color='green')
     plt.title(f"After MaxAbs Scaling: {column}")
+    plt.xlabel(column)
     plt.grid(True)
 
 plt.tight_layout()
-plt.suptitle("Before vs After MaxAbs Normalization (Seaborn KDE)", fontsize=18, y=1.02)
-plt.show()
\ No newline at end of file
+plt.suptitle("Before vs After MaxAbs Normalization (KDE)", fontsize=18, y=1.02)
+plt.show()
@@ -0,0 +1,48 @@
+import threading
+from collections import OrderedDict
+
+# In-process LRU caches for computed results (indicators, correlations,
+# densities, pyramids, forecasts). Values are shared between callers, so they
+# must not be mutated after put().
+
+
+class LRU:
+    def __init__(self, size):
+        self.size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    # {key: value} for the keys present; each hit becomes the most recently used
+    def get_many(self, keys):
+        with self._lock:
+            found = {k: self._items[k] for k in keys if k in self._items}
+            for k in found:
+                self._items.move_to_end(k)
+        return found
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def put_many(self, items):
+        with self._lock:
+            for k, value in items:
+                self._items[k] = value
+                self._items.move_to_end(k)
+            while len(self._items) > self.size:
+                self._items.popitem(last=False)
+
+    def put(self, key, value):
+        self.put_many([(key, value)])
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+# Cheap identity of a frame's data: columns, index range, length and the raw
+# bytes of the last row (where a refreshed forming bar shows up)
+def fingerprint(frame):
+    if not len(frame):
+        return tuple(frame.columns), (None, None), 0, b""
+    last = frame.iloc[-1].to_numpy().tobytes()
+    return tuple(frame.columns), (frame.index[0], frame.index[-1]), len(frame), last
@@ -0,0 +1,210 @@
+import base64
+import contextlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import scheduler
+import shared_cache
+import store
+
+# Disk-backed cache for slow per-symbol lookups (CoinGecko logos, yfinance
+# currency). Lookups never block: get() returns whatever is on disk, even if
+# stale, and refreshes missing or stale entries on a background pool.
+# Entries survive restarts; the least recently used are evicted past MAX_ENTRIES.
+
+COINGECKO_API = os.environ.get("COINGECKO_API", "https://api.coingecko.com/api/v3")
+HTTP_TIMEOUT = 10
+MAX_ENTRIES = 5000
+RETRY_AFTER = 60  # seconds before a failed lookup is tried again
+DAY = 24 * 3600
+TTL = {"logo": 7 * DAY, "currency": 30 * DAY}
+
+
+# Logo image for a CoinGecko coin id, inlined as a data URI so charts need no extra request
+def _get(url):
+    response = requests.get(url, timeout=HTTP_TIMEOUT)
+    if response.status_code == 429 or response.status_code >= 500:
+        response.raise_for_status()  # let the scheduler back off and retry
+    return response
+
+
+def fetch_logo(coin_id):
+    response = scheduler.call("coingecko", scheduler.METADATA, _get, f"{COINGECKO_API}/coins/{coin_id}")
+    if response.status_code == 404:
+        return None  # unknown coin id: cached like a logo
+    # Anything else (401/403 from a key or edge block) is a failed lookup, retried after RETRY_AFTER
+    response.raise_for_status()
+    url = response.json()["image"]["large"]
+    image = scheduler.call("coingecko", scheduler.METADATA, _get, url)
+    if image.status_code != 200:
+        return url
+    mime = image.headers.get("Content-Type", "image/png").split(";")[0]
+    return f"data:{mime};base64,{base64.b64encode(image.content).decode()}"
+
+
+def fetch_currency(ticker):
+    info = scheduler.call("yahoo", scheduler.METADATA, lambda: scheduler.yahoo().Ticker(ticker).info)
+    return info.get("currency", "USD")
+
+
+class AssetCache:
+    def __init__(self, path, fetchers, ttl=TTL, max_entries=MAX_ENTRIES, workers=4):
+        self.path = path
+        self.fetchers = fetchers
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="metadata")
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._failed = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute("CREATE TABLE IF NOT EXISTS entries (kind TEXT, key TEXT, value TEXT,"
+                       " fetched_at REAL, accessed_at REAL, PRIMARY KEY (kind, key))")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    # (value, fetched_at) from disk, or None when never fetched
+    def peek(self, kind, key):
+        with self._connect() as db:
+            row = db.execute("SELECT value, fetched_at FROM entries WHERE kind = ? AND key = ?",
+                             (kind, key)).fetchone()
+            if row is not None:
+                db.execute("UPDATE entries SET accessed_at = ? WHERE kind = ? AND key = ?",
+                           (time.time(), kind, key))
+        return None if row is None else (json.loads(row[0]), row[1])
+
+    def put(self, kind, key, value):
+        now = time.time()
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                       (kind, key, json.dumps(value), now, now))
+            db.execute("DELETE FROM entries WHERE rowid IN (SELECT rowid FROM entries"
+                       " ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def _stale(self, kind, fetched_at):
+        return time.time() - fetched_at > self.ttl.get(kind, DAY)
+
+    def _refresh(self, kind, key):
+        try:
+            # Other processes share the file: only one of them looks a key up
+            with shared_cache.cache(os.path.dirname(self.path)).lock(("metadata", kind, key)):
+                row = self.peek(kind, key)
+                if row is None or self._stale(kind, row[1]):
+                    self.put(kind, key, self.fetchers[kind](key))
+        except Exception:
+            with self._lock:
+                self._failed[(kind, key)] = time.monotonic()
+        finally:
+            with self._lock:
+                self._inflight.pop((kind, key), None)
+
+    # Background refresh, at most one in flight per entry
+    def schedule(self, kind, key):
+        with self._lock:
+            k = (kind, key)
+            if k in self._inflight:
+                return self._inflight[k]
+            if time.monotonic() - self._failed.get(k, -RETRY_AFTER) < RETRY_AFTER:
+                return None
+            self._failed.pop(k, None)
+            future = self._pool.submit(self._refresh, kind, key)
+            self._inflight[k] = future
+            return future
+
+    # Cached value (possibly stale) or `default`; `wait` seconds may be spent on a first fetch
+    def get(self, kind, key, default=None, wait=0.0):
+        if key is None:
+            return default
+        row = self.peek(kind, key)
+        if row is None or self._stale(kind, row[1]):
+            future = self.schedule(kind, key)
+            if row is None and future is not None and wait > 0:
+                try:
+                    future.result(timeout=wait)
+                except Exception:
+                    pass
+                row = self.peek(kind, key)
+        if row is None or row[0] is None:
+            return default
+        return row[0]
+
+    def prefetch(self, kind, keys):
+        for key in keys:
+            if key is None:
+                continue
+            row = self.peek(kind, key)
+            if row is None or self._stale(kind, row[1]):
+                self.schedule(kind, key)
+
+    def logo(self, coin_id, wait=0.0):
+        return self.get("logo", coin_id, wait=wait)
+
+    def currency(self, ticker, wait=0.0):
+        return self.get("currency", ticker, default="USD", wait=wait)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# Process-wide cache in the store directory
+def cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = AssetCache(os.path.join(store.STORE_DIR, "metadata.sqlite"),
+                                {"logo": fetch_logo, "currency": fetch_currency})
+        return _cache
+
+
+# Local stand-in for the CoinGecko endpoints used above, for offline testing:
+#   python metadata.py 8765  then  COINGECKO_API=http://127.0.0.1:8765 streamlit run ...
+def stub_server(port=8765, delay=0.0):
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    png = base64.b64decode("iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII=")
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            if self.path.startswith("/coins/"):
+                coin = self.path.rsplit("/", 1)[-1]
+                body = json.dumps({"id": coin, "image": {
+                    "large": f"http://127.0.0.1:{self.server.server_port}/images/{coin}.png"}}).encode()
+                kind = "application/json"
+            elif self.path.startswith("/images/"):
+                body, kind = png, "image/png"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", kind)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return ThreadingHTTPServer(("127.0.0.1", port), Handler)
+
+
+if __name__ == "__main__":
+    import sys
+    server = stub_server(int(sys.argv[1]) if len(sys.argv) > 1 else 8765)
+    print(f"CoinGecko stand-in on http://127.0.0.1:{server.server_port}")
+    server.serve_forever()
@@ -0,0 +1,24 @@
+import pandas as pd
+
+# Multi-symbol panels for the comparison views: per-symbol bars joined into
+# one frame per field, then one as-of join onto the main chart's timestamps.
+FIELDS = ["Close", "Volume"]
+
+
+# {field: time x symbol frame} from {symbol: bars} frames
+def from_bars(frames):
+    return {f: pd.DataFrame({s: bars[f] for s, bars in frames.items()}) for f in FIELDS}
+
+
+# Align all fields onto `index` in one reindex (last value at or before each timestamp)
+# and rebase close prices to 100 at each symbol's first valid value
+def align_panel(fields, index, normalize=False):
+    wide = pd.concat(fields, axis=1).sort_index()
+    wide = wide[~wide.index.duplicated(keep="last")]
+    aligned = wide.reindex(index, method="ffill")
+    aligned = aligned.dropna(axis=1, how="all")
+    close = aligned["Close"]
+    volume = aligned["Volume"].reindex(columns=close.columns)
+    if normalize:
+        close = close / close.bfill().iloc[0] * 100
+    return close, volume
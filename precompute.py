@@ -0,0 +1,77 @@
+import argparse
+import datetime
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+import indicators
+import screener
+import store
+
+# Headless precompute job, meant to run on a schedule (e.g. cron before market
+# open) so the dashboards find everything in the local store:
+#   python precompute.py --tickers ticker.csv --start 2022-01-01
+# Per symbol it fills history gaps, stores the indicator columns the apps use
+# and the screener row; the screener rows are also combined into one table.
+
+DEFAULT_INDICATORS = "EMA12,EMA26,EMA20,STD5,STD10,STD20,Returns,Volatility20"
+
+
+def precompute_symbol(ticker, start, end, interval, names):
+    t0 = time.perf_counter()
+    df = store.read_history(ticker, start, end, interval=interval)
+    if df.empty:
+        return ticker, None, 0, time.perf_counter() - t0
+    ind = indicators.for_series(df["Close"], names, label=ticker)
+    # Stored with the closes they were computed from; see indicators.for_bars
+    ind.insert(0, "Close", df["Close"])
+    store.write_derived(ind, interval, "indicators", ticker=ticker)
+    row = screener.screen_bars(ticker, df) if interval == "1d" else None
+    return ticker, row, len(df), time.perf_counter() - t0
+
+
+def run(tickers, start, end, interval="1d", names=DEFAULT_INDICATORS.split(","), workers=None):
+    rows, failed = [], {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(precompute_symbol, t, start, end, interval, names): t for t in tickers}
+        for future in as_completed(futures):
+            ticker = futures[future]
+            try:
+                ticker, row, bars, seconds = future.result()
+            except Exception as e:
+                failed[ticker] = str(e)
+                print(f"{ticker:>10}  FAILED  {e}")
+                continue
+            print(f"{ticker:>10}  {bars:6d} bars  {seconds:6.2f}s")
+            if row is not None:
+                rows.append(row)
+    if rows:
+        table = pd.DataFrame(rows, columns=screener.COLUMNS)
+        table = table.sort_values("EMA Spread %", ascending=False, ignore_index=True)
+        store.write_derived(table, interval, "signals")
+    return rows, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precompute history, indicators and signals into the local store")
+    parser.add_argument("--tickers", default="ticker.csv", help="CSV whose first column lists tickers")
+    parser.add_argument("--start", default="2022-01-01")
+    parser.add_argument("--end", default=str(datetime.date.today() + datetime.timedelta(days=1)))
+    parser.add_argument("--interval", default="1d")
+    parser.add_argument("--indicators", default=DEFAULT_INDICATORS)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    tickers = pd.read_csv(args.tickers).iloc[:, 0].dropna().unique().tolist()
+    t0 = time.perf_counter()
+    rows, failed = run(tickers, args.start, args.end, args.interval,
+                       args.indicators.split(","), args.workers)
+    print(f"\n{len(tickers) - len(failed)}/{len(tickers)} symbols in {time.perf_counter() - t0:.1f}s"
+          f" -> {store.STORE_DIR}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
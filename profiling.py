@@ -0,0 +1,208 @@
+import contextlib
+import cProfile
+import datetime
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from collections import defaultdict
+
+import scheduler
+import store
+
+# Stage-level timing for the dashboards. Each Streamlit rerun is one "run":
+#   profiling.start_run("final", st)        at the top of the script
+#   @profiling.timed("load_data")           around (outside) a cached function;
+#   profiling.mark_miss()                   inside its body tells a miss from a hit
+#   with profiling.stage("figure"): ...     around any other block
+#   profiling.plotly_chart(st, fig)         times the chart hand-off to Streamlit
+#   @st.fragment @profiling.fragment("final")  a tab that can rerun on its own
+#   profiling.finish_run(st)                logs the run and draws the sidebar panel
+# Runs are appended to store/profile.jsonl and totals are kept in
+# store/metrics.prom (Prometheus text format). STOCK_PROFILE=1 turns logging on
+# for every run, STOCK_PROFILE=cprofile also captures a cProfile per run.
+
+MODE = os.environ.get("STOCK_PROFILE", "")
+
+_local = threading.local()
+
+
+# Output files live in the store directory (resolved at call time: store imports this module)
+def _path(name):
+    return os.path.join(store.STORE_DIR, name)
+
+
+_totals_lock = threading.Lock()
+_totals = defaultdict(float)
+
+
+class Run:
+    def __init__(self, app, profile=False, detail=False):
+        self.app = app
+        self.detail = detail  # also measure serialized chart bytes
+        self.started = time.perf_counter()
+        self.at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        self.stages = []
+        self.counters = defaultdict(int)
+        self.profiler = cProfile.Profile() if profile else None
+        if self.profiler:
+            self.profiler.enable()
+
+
+def current():
+    return getattr(_local, "run", None)
+
+
+def start_run(app, st=None):
+    state = st.session_state if st is not None else {}
+    profile = MODE == "cprofile" or bool(state.get("_profiling_cprofile"))
+    _local.run = Run(app, profile, detail=bool(MODE or state.get("_profiling_panel")))
+    return _local.run
+
+
+def count(name, hit):
+    run = current()
+    if run is not None:
+        run.counters[f"{name}_{'hit' if hit else 'miss'}"] += 1
+
+
+def _size(value):
+    if hasattr(value, "memory_usage"):
+        usage = value.memory_usage(deep=False)
+        return int(usage.sum() if hasattr(usage, "sum") else usage)
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    return None
+
+
+@contextlib.contextmanager
+def stage(name, **fields):
+    record = dict(stage=name, **fields)
+    stack = getattr(_local, "stack", [])
+    _local.stack = stack + [record]
+    t0 = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record["ms"] = round((time.perf_counter() - t0) * 1000, 3)
+        _local.stack = stack
+        run = current()
+        if run is not None:
+            run.stages.append(dict(record))
+
+
+# Inside a cached function body: the enclosing timed() call was a cache miss
+def mark_miss():
+    stack = getattr(_local, "stack", [])
+    if stack:
+        stack[-1]["cache"] = "miss"
+
+
+def timed(name, cached=True):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                if cached:
+                    record["cache"] = "hit"
+                result = fn(*args, **kwargs)
+                if hasattr(result, "__len__"):
+                    record["rows"] = len(result)
+                size = _size(result)
+                if size is not None:
+                    record["bytes"] = size
+            if cached:
+                count(name, record["cache"] == "hit")
+            return result
+        return wrapper
+    return decorator
+
+
+# Under @st.fragment: a stage of the full rerun, or a run of its own
+# ("<app>.<function>") when only the fragment reruns
+def fragment(app):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if current() is not None:
+                with stage(fn.__name__):
+                    return fn(*args, **kwargs)
+            start_run(f"{app}.{fn.__name__}")
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                finish_run()
+        return wrapper
+    return decorator
+
+
+def plotly_chart(container, fig, **kwargs):
+    with stage("plotly_chart") as record:
+        record["points"] = sum(len(t.x) for t in fig.data if getattr(t, "x", None) is not None)
+        if current() is not None and current().detail:
+            record["bytes"] = len(fig.to_json())
+        return container.plotly_chart(fig, **kwargs)
+
+
+def _write_metrics(run, total_ms):
+    with _totals_lock:
+        _totals[("runs", run.app, "")] += 1
+        _totals[("run_seconds", run.app, "")] += total_ms / 1000
+        for s in run.stages:
+            _totals[("stage_seconds", run.app, s["stage"])] += s["ms"] / 1000
+            _totals[("stage_calls", run.app, s["stage"])] += 1
+        for name, n in run.counters.items():
+            _totals[("cache_events", run.app, name)] += n
+        lines = []
+        for (metric, app, label), value in sorted(_totals.items()):
+            tag = f'app="{app}"' + (f',stage="{label}"' if label else "")
+            lines.append(f"stock_{metric}_total{{{tag}}} {value}")
+    if scheduler._scheduler is not None:
+        for provider, stats in scheduler.get().stats().items():
+            for priority, depth in stats["queue_depth"].items():
+                lines.append(f'stock_upstream_queue_depth{{provider="{provider}",priority="{priority}"}} {depth}')
+            lines.append(f'stock_upstream_in_flight{{provider="{provider}"}} {stats["in_flight"]}')
+    tmp = _path("metrics.prom") + f".{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp, _path("metrics.prom"))
+
+
+def finish_run(st=None):
+    run = current()
+    if run is None:
+        return None
+    _local.run = None
+    total_ms = round((time.perf_counter() - run.started) * 1000, 3)
+    show = st is not None and st.sidebar.checkbox("⏱ Show profiling", key="_profiling_panel")
+    top = None
+    if run.profiler:
+        run.profiler.disable()
+        os.makedirs(_path("profiles"), exist_ok=True)
+        run.profiler.dump_stats(os.path.join(_path("profiles"), f"{run.app}-{int(time.time() * 1000)}.prof"))
+        out = io.StringIO()
+        pstats.Stats(run.profiler, stream=out).sort_stats("cumulative").print_stats(20)
+        top = out.getvalue()
+
+    entry = {"at": run.at, "app": run.app, "total_ms": total_ms,
+             "stages": run.stages, "counters": dict(run.counters)}
+    if MODE or show:
+        os.makedirs(store.STORE_DIR, exist_ok=True)
+        with open(_path("profile.jsonl"), "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        _write_metrics(run, total_ms)
+
+    if show:
+        with st.sidebar.expander("⏱ Last rerun", expanded=True):
+            st.write(f"Total: **{total_ms:.0f} ms**")
+            if run.stages:
+                st.dataframe(run.stages, hide_index=True)
+            if run.counters:
+                st.json(dict(run.counters))
+            st.checkbox("Capture cProfile on next rerun", key="_profiling_cprofile")
+            if top:
+                st.code(top)
+    return entry
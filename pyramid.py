@@ -0,0 +1,112 @@
+import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import decimate
+import memo
+import profiling
+import store
+
+# Multi-resolution bars for the dashboards. Only the finest interval Yahoo
+# serves for a period (the base) is stored and fetched; every coarser level
+# is aggregated from the level below it, so the whole pyramid costs about 0.6x
+# the base series on top of it, and switching interval is a local lookup.
+#   bars(ticker, period, interval)  -> (bars, interval actually served)
+#   bars_many(tickers, ...)         -> {ticker: bars}, the bases read concurrently
+
+LEVELS = ["5m", "15m", "30m", "1h", "1d"]
+AUTO = "Auto"
+# Yahoo keeps 5m bars for 60 days and hourly bars for 730; periods reaching
+# further back start from a coarser base
+BASES = [("5m", pd.Timedelta(days=59)), ("1h", pd.Timedelta(days=729)), ("1d", None)]
+TTL = 60  # seconds a pyramid is served before its base is re-read
+_cache = memo.LRU(32)
+
+
+def base_for(start, now):
+    for interval, reach in BASES:
+        if reach is None or now - start <= reach:
+            return interval
+
+
+# OHLCV bars aggregated into `interval` buckets (UTC, so daily buckets start at midnight UTC)
+def resample(bars, interval):
+    bars = bars.dropna(subset=["Close"])
+    if bars.empty:
+        return bars
+    width = store.bar_delta(interval).value
+    bucket = bars.index.as_unit("ns").asi8 // width
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], len(bucket)] - 1
+    index = pd.DatetimeIndex(bucket[starts] * width, tz="UTC", name="Date")
+    return pd.DataFrame({
+        "Open": bars["Open"].to_numpy()[starts],
+        "High": np.fmax.reduceat(bars["High"].to_numpy(), starts),
+        "Low": np.fmin.reduceat(bars["Low"].to_numpy(), starts),
+        "Close": bars["Close"].to_numpy()[ends],
+        "Volume": np.add.reduceat(np.nan_to_num(bars["Volume"].to_numpy()), starts),
+    }, index=index)
+
+
+# {interval: bars} from the base up, each level built from the one below
+def build(base, base_interval, levels=LEVELS):
+    pyramid = {base_interval: base}
+    below = base
+    for interval in levels:
+        if store.bar_delta(interval) > store.bar_delta(base_interval):
+            below = pyramid[interval] = resample(below, interval)
+    return pyramid
+
+
+def _load(ticker, period):
+    now = store.to_utc(datetime.datetime.now(datetime.timezone.utc))
+    start = store.period_start(period, now)
+    base = base_for(start, now)
+    start = start.floor("D") if store.is_daily(base) else start.floor(store.bar_delta(base))
+    bars = store.read_history(ticker, start, now + store.bar_delta(base), base)
+    with profiling.stage("pyramid", ticker=ticker, base=base, rows=len(bars)):
+        return build(bars, base)
+
+
+# The pyramid for (ticker, period), re-read from the store after TTL seconds
+def load(ticker, period):
+    key = (ticker, period)
+    found = _cache.get(key)
+    if found is not None and time.monotonic() - found[0] < TTL:
+        profiling.count("pyramid", hit=True)
+        return found[1]
+    profiling.count("pyramid", hit=False)
+    pyramid = _load(ticker, period)
+    _cache.put(key, (time.monotonic(), pyramid))
+    return pyramid
+
+
+# Finest level that fits the chart's point budget
+def auto_interval(pyramid, max_points=decimate.MAX_POINTS):
+    for interval in sorted(pyramid, key=store.bar_delta):
+        if len(pyramid[interval]) <= max_points:
+            return interval
+    return max(pyramid, key=store.bar_delta)
+
+
+# Bars at `interval` (or AUTO). Intervals finer than the period's base are served
+# at the base; returns (bars, interval served)
+def bars(ticker, period, interval):
+    pyramid = load(ticker, period)
+    if interval == AUTO:
+        interval = auto_interval(pyramid)
+    elif interval not in pyramid:
+        interval = min(pyramid, key=store.bar_delta)
+    return pyramid[interval].copy(), interval
+
+
+# Bars for several tickers at the same interval; the bases are read from the
+# store on a thread pool, so a cold comparison waits about one read, not one per symbol
+def bars_many(tickers, period, interval, workers=8):
+    tickers = list(dict.fromkeys(tickers))
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tickers)))) as pool:
+        served = pool.map(lambda t: bars(t, period, interval)[0], tickers)
+        return dict(zip(tickers, served))
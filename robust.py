@@ -1,33 +1,37 @@
-import pandas as pd
-import seaborn as sns
+import sys
 import matplotlib.pyplot as plt
-from sklearn.preprocessing import RobustScaler
 
-# Load dataset (first 1000 rows)
-df = pd.read_csv("C:/Users/hardb/Downloads/archive (3)/housing.csv").head(1000)
+import kde
+import scaling
+
+# Dataset path (or pass one on the command line)
+path = sys.argv[1] if len(sys.argv) > 1 else "C:/Users/hardb/Downloads/archive (3)/housing.csv"
 
 # Select only 'median_house_value' column
 column = 'median_house_value'
-original = df[[column]]
 
-# Apply RobustScaler
-scaler = RobustScaler()
-scaled = scaler.fit_transform(original)
-scaled_df = pd.DataFrame(scaled, columns=[column])
+# Fit RobustScaler over the whole file in chunks (median / IQR from a quantile sketch)
+scaler = scaling.fit_robust(path, [column])
+print(f"Median: {scaler.center_[0]:.2f}, IQR: {scaler.scale_[0]:.2f}")
+
+# Densities over the whole file; the scaled one is the same density, rescaled
+# (None for a constant or empty column, which kde.plot leaves blank)
+original = kde.for_csv(path, [column])[column]
+scaled = original.affine(scaler.center_[0], scaler.scale_[0]) if original is not None else None
 
 # Create one figure with two separate KDE plots (before and after)
 plt.figure(figsize=(12, 5))
 
 # Subplot 1 - Before Scaling
 plt.subplot(1, 2, 1)
-sns.kdeplot(data=original[column], fill=True, color='blue')
+kde.plot(plt.gca(), original, color='blue')
 plt.title("Before Robust Scaling")
 plt.xlabel(column)
 plt.grid(True)
 
 # Subplot 2 - After Scaling
 plt.subplot(1, 2, 2)
-sns.kdeplot(data=scaled_df[column], fill=True, color='green')
+kde.plot(plt.gca(), scaled, color='green')
 plt.title("After Robust Scaling")
 plt.xlabel(column + " (Scaled)")
 plt.grid(True)
@@ -35,4 +39,4 @@ plt.grid(True)
 # Layout and show
 plt.tight_layout()
 plt.suptitle("Robust Scaling - median_house_value", fontsize=16, y=1.05)
-plt.show()
\ No newline at end of file
+plt.show()
@@ -0,0 +1,198 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Every upstream request (yfinance, CoinGecko) goes through one scheduler per
+# process. Per provider it enforces a token-bucket rate limit and a concurrency
+# cap, serves waiting calls by priority class, and retries transient failures
+# (timeouts, dropped connections, HTTP 429 / 5xx) with jittered exponential
+# backoff. Anything else, such as an unknown symbol, fails on the first attempt.
+
+LIVE, HISTORY, METADATA = 0, 1, 2
+PRIORITY_NAMES = {LIVE: "live", HISTORY: "history", METADATA: "metadata"}
+
+# name: (requests per second, burst, concurrent requests)
+PROVIDERS = {
+    "yahoo": (4.0, 8, 4),
+    "coingecko": (0.5, 3, 2),
+}
+RETRIES = 3
+BACKOFF = 1.0      # first retry delay in seconds, doubled per attempt
+MAX_BACKOFF = 30.0
+# Exception classes of requests / curl_cffi / yfinance that are worth retrying,
+# matched by name so none of them has to be imported here
+TRANSIENT = {"Timeout", "ConnectTimeout", "ReadTimeout", "ConnectionError", "ProxyError",
+             "ChunkedEncodingError", "YFRateLimitError"}
+
+
+def is_transient(e):
+    if isinstance(e, (TimeoutError, ConnectionError)):
+        return True
+    if any(cls.__name__ in TRANSIENT for cls in type(e).__mro__):
+        return True
+    response = getattr(e, "response", None)
+    status = getattr(response, "status_code", None) or getattr(e, "code", None)
+    return isinstance(status, int) and (status == 429 or status >= 500)
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._stamp) * self.rate)
+        self._stamp = now
+
+    # Block until a token is available, then take it
+    def take(self):
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self.tokens
+
+
+class _Job:
+    def __init__(self, priority, fn, args, kwargs, retries):
+        self.priority = priority
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.retries = retries
+        self.attempt = 0
+        self.future = Future()
+
+
+class Provider:
+    def __init__(self, name, rate, burst, concurrency):
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = concurrency
+        self._slots = threading.Semaphore(concurrency)
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"upstream-{name}")
+        self.counts = Counter()
+        self.in_flight = 0
+        threading.Thread(target=self._dispatch, name=f"scheduler-{name}", daemon=True).start()
+
+    def enqueue(self, job):
+        with self._cond:
+            heapq.heappush(self._queue, (job.priority, next(self._seq), job))
+            self.counts["queued"] += 1
+            self._cond.notify()
+
+    # Take a slot and a token first, then pick the most urgent waiting job
+    def _dispatch(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+            self._slots.acquire()
+            self.bucket.take()
+            with self._cond:
+                _, _, job = heapq.heappop(self._queue)
+                self.in_flight += 1
+            try:
+                self._pool.submit(self._run, job)
+            except RuntimeError as e:
+                # Interpreter shutting down: fail the waiting callers instead of hanging them
+                job.future.set_exception(e)
+                with self._cond:
+                    for _, _, waiting in self._queue:
+                        waiting.future.set_exception(e)
+                    self._queue.clear()
+                return
+
+    def _run(self, job):
+        try:
+            result = job.fn(*job.args, **job.kwargs)
+        except Exception as e:
+            if job.attempt < job.retries and is_transient(e):
+                job.attempt += 1
+                delay = min(MAX_BACKOFF, BACKOFF * 2 ** (job.attempt - 1)) * random.uniform(0.5, 1.5)
+                self.counts["retries"] += 1
+                timer = threading.Timer(delay, self.enqueue, (job,))
+                timer.daemon = True
+                timer.start()
+            else:
+                self.counts["failed"] += 1
+                job.future.set_exception(e)
+        else:
+            self.counts["completed"] += 1
+            job.future.set_result(result)
+        finally:
+            with self._cond:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self):
+        with self._cond:
+            depth = Counter(PRIORITY_NAMES[p] for p, _, _ in self._queue)
+            return {
+                "queue_depth": {name: depth.get(name, 0) for name in PRIORITY_NAMES.values()},
+                "in_flight": self.in_flight,
+                "tokens": round(self.bucket.available(), 2),
+                **{k: self.counts[k] for k in ("queued", "completed", "retries", "failed")},
+            }
+
+
+class Scheduler:
+    def __init__(self, providers=PROVIDERS):
+        self.providers = {name: Provider(name, *limits) for name, limits in providers.items()}
+
+    def submit(self, provider, priority, fn, *args, retries=RETRIES, **kwargs):
+        job = _Job(priority, fn, args, kwargs, retries)
+        self.providers[provider].enqueue(job)
+        return job.future
+
+    # Blocking call; raises the last error once retries are exhausted
+    def call(self, provider, priority, fn, *args, retries=RETRIES, **kwargs):
+        return self.submit(provider, priority, fn, *args, retries=retries, **kwargs).result()
+
+    def stats(self):
+        return {name: p.stats() for name, p in self.providers.items()}
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+_yfinance = None
+
+
+# yfinance takes most of a second to import, so it is loaded on the first upstream call
+def yahoo():
+    global _yfinance
+    if _yfinance is None:
+        import yfinance
+        _yfinance = yfinance
+    return _yfinance
+
+
+def get():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = Scheduler()
+        return _scheduler
+
+
+def call(provider, priority, fn, *args, **kwargs):
+    return get().call(provider, priority, fn, *args, **kwargs)
@@ -0,0 +1,101 @@
+import datetime
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import indicators
+import store
+
+# Universe-wide EMA screener: the dashboards' BUY/SELL rule plus strength
+# metrics for every ticker. Closes are loaded through a bounded thread pool,
+# then the indicators for the whole universe come from one 2-D pass.
+
+MIN_BARS = 30
+INDICATORS = ["EMA12", "EMA26", "EMA20", "Volatility20"]
+COLUMNS = ["Ticker", "Signal", "Close", "Change 1D %", "EMA Spread %",
+           "Above EMA20", "Volatility %", "Bars"]
+
+
+# `close` is the symbol's closes, `last` its latest value of each indicator
+def _row(ticker, close, last):
+    price = close[-1]
+    return {
+        "Ticker": ticker,
+        "Signal": "BUY" if last["EMA12"] > last["EMA26"] else "SELL",
+        "Close": price,
+        "Change 1D %": (price / close[-2] - 1) * 100,
+        "EMA Spread %": (last["EMA12"] - last["EMA26"]) / last["EMA26"] * 100,
+        "Above EMA20": bool(price > last["EMA20"]),
+        "Volatility %": last["Volatility20"] * 100,
+        "Bars": len(close),
+    }
+
+
+def screen_symbol(ticker, start, end):
+    return screen_bars(ticker, store.read_history(ticker, start, end))
+
+
+# Row for bars already loaded (None with fewer than MIN_BARS closes)
+def screen_bars(ticker, df):
+    close = df["Close"].dropna()
+    if len(close) < MIN_BARS:
+        return None
+    ind = indicators.for_series(close, INDICATORS, label=ticker)
+    return _row(ticker, close.to_numpy(), ind.iloc[-1])
+
+
+# Each symbol's closes as one column, right-aligned so row -1 is every symbol's
+# latest bar; columns never have gaps inside them, whatever the calendars
+def _stack(closes):
+    rows = max(len(c) for c in closes.values())
+    values = np.full((rows, len(closes)), np.nan)
+    for j, close in enumerate(closes.values()):
+        values[rows - len(close):, j] = close
+    return pd.DataFrame(values, columns=list(closes))
+
+
+# Returns (table sorted by EMA spread, {ticker: error message})
+def screen(tickers, start, end, workers=8):
+    tickers = list(dict.fromkeys(tickers))
+    closes, errors = {}, {}
+
+    def run(ticker):
+        try:
+            return ticker, store.read_history(ticker, start, end)["Close"].dropna().to_numpy(), None
+        except Exception as e:
+            return ticker, None, str(e)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(tickers)))) as pool:
+        for ticker, close, error in pool.map(run, tickers):
+            if error is not None:
+                errors[ticker] = error
+            elif len(close) < MIN_BARS:
+                errors[ticker] = f"fewer than {MIN_BARS} bars"
+            else:
+                closes[ticker] = close
+
+    rows = []
+    if closes:
+        ind = indicators.for_panel(_stack(closes), INDICATORS, label=("screener", start, end))
+        last = pd.DataFrame({name: frame.iloc[-1] for name, frame in ind.items()})
+        rows = [_row(ticker, close, last.loc[ticker]) for ticker, close in closes.items()]
+    table = pd.DataFrame(rows, columns=COLUMNS)
+    table = table.sort_values("EMA Spread %", ascending=False, ignore_index=True)
+    return table, errors
+
+
+# Signal strength in [-1, 1] for colouring: EMA spread scaled by volatility
+def strength(table):
+    vol = table["Volatility %"].replace(0, np.nan)
+    return np.tanh(table["EMA Spread %"] / vol).fillna(0.0)
+
+
+# Table written by precompute.py, with the time it was written (None if absent)
+def load_precomputed(interval="1d"):
+    table = store.read_derived(interval, "signals")
+    if table is None:
+        return None, None
+    mtime = os.path.getmtime(store.derived_path(interval, "signals"))
+    return table, datetime.datetime.fromtimestamp(mtime)
@@ -0,0 +1,124 @@
+import contextlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+
+# Result cache shared by every process on the machine (all Streamlit workers,
+# the precompute job), backed by one SQLite file.
+#   get_or_compute(key, fn, ttl) - at most one caller runs fn per key; the others
+#                                  wait for its lease and then read its result
+#   lock(key)                    - the same single-flight lease around any block,
+#                                  e.g. the store's gap filling
+# A lease expires after LEASE seconds so a crashed owner cannot wedge a key;
+# a live owner renews it every LEASE / 3 seconds for as long as its block runs
+# (a gap fill can sit behind the rate limiter or in retry backoff for minutes).
+
+LEASE = 120.0
+POLL = 0.05
+_MISSING = object()
+
+
+def _key(key):
+    return key if isinstance(key, str) else repr(key)
+
+
+class SharedCache:
+    def __init__(self, path, lease=LEASE):
+        self.path = path
+        self.lease = lease
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB, expires REAL)")
+            db.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT, until REAL)")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    def get(self, key, default=None):
+        with self._connect() as db:
+            row = db.execute("SELECT value, expires FROM results WHERE key = ?", (_key(key),)).fetchone()
+        if row is None or row[1] < time.time():
+            return default
+        return pickle.loads(row[0])
+
+    def put(self, key, value, ttl):
+        now = time.time()
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?)",
+                       (_key(key), pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + ttl))
+            db.execute("DELETE FROM results WHERE expires < ?", (now,))
+
+    def _acquire(self, key, owner):
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute("SELECT until FROM leases WHERE key = ?", (key,)).fetchone()
+                if row is not None and row[0] > now:
+                    return False
+                db.execute("INSERT OR REPLACE INTO leases VALUES (?, ?, ?)", (key, owner, now + self.lease))
+                return True
+            finally:
+                db.execute("COMMIT")
+
+    def _renew(self, key, owner):
+        with self._connect() as db:
+            db.execute("UPDATE leases SET until = ? WHERE key = ? AND owner = ?",
+                       (time.time() + self.lease, key, owner))
+
+    def _release(self, key, owner):
+        with self._connect() as db:
+            db.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    @contextlib.contextmanager
+    def lock(self, key):
+        key, owner = "lock:" + _key(key), uuid.uuid4().hex
+        while not self._acquire(key, owner):
+            time.sleep(POLL)
+        done = threading.Event()
+
+        def renew():
+            while not done.wait(self.lease / 3):
+                self._renew(key, owner)
+
+        renewer = threading.Thread(target=renew, name=f"lease-{key}", daemon=True)
+        renewer.start()
+        try:
+            yield
+        finally:
+            done.set()
+            renewer.join()
+            self._release(key, owner)
+
+    def get_or_compute(self, key, fn, ttl):
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self.lock(key):
+            # Whoever held the lease before us may already have stored the result
+            value = self.get(key, _MISSING)
+            if value is _MISSING:
+                value = fn()
+                self.put(key, value, ttl)
+        return value
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+# One SharedCache per directory, kept for the life of the process
+def cache(directory):
+    with _caches_lock:
+        if directory not in _caches:
+            _caches[directory] = SharedCache(os.path.join(directory, "shared.sqlite"))
+        return _caches[directory]
@@ -1,10 +1,19 @@
 import streamlit as st
-import yfinance as yf
 import pandas as pd
 import plotly.graph_objects as go
 import datetime
-import requests
 import time
+import uuid
+
+import correlation
+import decimate
+import forecast
+import indicators
+import live
+import metadata
+import profiling
+import screener
+import store
 
 # Map Yahoo tickers to CoinGecko IDs
 COIN_GECKO_MAP = {
@@ -15,31 +24,88 @@ COIN_GECKO_MAP = {
     "ADA-USD": "cardano",
 }
 
-@st.cache_data
+# Served from the disk-backed metadata cache; None until the background fetch lands
 def fetch_logo(coin_id):
-    url = f"https://api.coingecko.com/api/v3/coins/{coin_id}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        return response.json()["image"]["large"]
-    return None
+    return metadata.cache().logo(coin_id)
 
+@profiling.timed("fetch_data")
 @st.cache_data
 def fetch_data(ticker, start, end):
-    df = yf.Ticker(ticker).history(start=start, end=end, interval="1d")
-    df["STD"] = df["Close"].rolling(window=5).std()
-    df.to_csv(f"{ticker}.csv")
+    profiling.mark_miss()
+    df = store.read_history(ticker, start, end, interval="1d")
+    df["STD"] = indicators.for_bars(df, ["STD5"], ticker)["STD5"]
     return df
 
-# Load tickers
-tickers_df = pd.read_csv("ticker.csv")
-tickers = tickers_df["Ticker"].tolist()
+def session_id():
+    if "session_id" not in st.session_state:
+        st.session_state["session_id"] = uuid.uuid4().hex
+    return st.session_state["session_id"]
 
-# App layout
-st.set_page_config(layout="wide")
-tabs = st.tabs(["📈 Single Crypto Analysis", "📊 Compare Cryptos", "📉 EMA Strategy", "💹 Live Prices"])
+# Live chart fed by the shared per-symbol poller; reruns on its own every second
+@st.fragment(run_every=1)
+def live_stream_panel():
+    coin = st.session_state.get("live_stream")
+    if coin is None:
+        return
+    if time.time() > st.session_state["live_until"]:  # stream for 300 seconds
+        live.hub().unsubscribe(session_id(), coin)
+        st.session_state["live_stream"] = None
+        st.info("Live stream stopped. Press Start to resume.")
+        return
+
+    feed = live.hub().subscribe(session_id(), coin, interval="1m")
+    version, times, prices, overlays, (signal, crossed) = feed.snapshot()
+    if feed.error is not None:
+        st.error(f"Error: {feed.error}")
+    if not version:
+        if feed.polls:
+            st.warning("No live data yet. Please try again later.")
+        return
+
+    # The figure is built once per coin and only its trace arrays are swapped
+    if st.session_state.get("live_fig_coin") != coin:
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=[], y=[], mode="lines", name="Price"))
+        fig.add_trace(go.Scatter(x=[], y=[], mode="lines", name="EMA12"))
+        fig.add_trace(go.Scatter(x=[], y=[], mode="lines", name="EMA26"))
+        fig.add_trace(go.Scatter(x=[], y=[], mode="lines", name="STD5", yaxis="y2", opacity=0.5))
+        fig.update_layout(
+            title=f"{coin} Full-Day Live Chart",
+            xaxis_title="Time",
+            yaxis_title="Price",
+            xaxis=dict(showspikes=True),
+            yaxis2=dict(title="STD5", overlaying="y", side="right", showgrid=False),
+        )
+        st.session_state["live_fig"] = fig
+        st.session_state["live_fig_coin"] = coin
+    fig = st.session_state["live_fig"]
+    fig.data[0].x, fig.data[0].y = decimate.line(times, prices)
+    for trace in fig.data[1:]:
+        trace.x, trace.y = decimate.line(times, overlays[trace.name])
+    # Tracked bar by bar by the feed's streaming crossover
+    st.subheader(f"Live Signal: **{signal}**" + (" (crossed on the latest bar)" if crossed else ""))
+    st.plotly_chart(fig, use_container_width=True)
+
+@st.cache_data(ttl=300)
+def run_screener(tickers, start, end):
+    return screener.screen(tickers, start, end)
+
+@st.cache_data(ttl=300)
+def load_closes(tickers, start, end):
+    return correlation.load_panel(tickers, start, end)
+
+# Read once per server process; the logo prefetch is started at the same time
+@st.cache_resource
+def load_tickers():
+    metadata.cache().prefetch("logo", COIN_GECKO_MAP.values())
+    return tuple(pd.read_csv("ticker.csv")["Ticker"])
+
+# Each tab is a fragment: its widgets rerun that tab only
 
 # ---------------------------- Window 1 ----------------------------
-with tabs[0]:
+@st.fragment
+@profiling.fragment("stock_predictor")
+def single_tab(tickers):
     st.header("📈 Single Crypto Analysis")
     col1, col2 = st.columns(2)
     with col1:
@@ -47,8 +113,8 @@ with tabs[0]:
     with col2:
         metric = st.selectbox("Metric", ["Open", "Close", "Volume", "STD"])
 
-    start = st.date_input("Start Date", datetime.date(2022, 1, 1))
-    end = st.date_input("End Date", datetime.date.today())
+    start = st.date_input("Start Date", datetime.date(2022, 1, 1), key="start")
+    end = st.date_input("End Date", datetime.date.today(), key="end")
 
     if st.button("Fetch Data"):
         df = fetch_data(selected, start, end)
@@ -56,25 +122,28 @@ with tabs[0]:
             st.warning("Not enough data to plot. Please choose a wider or more recent range.")
         else:
             logo_url = fetch_logo(COIN_GECKO_MAP.get(selected))
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=df.index, y=df[metric], mode="lines", name=metric))
-            if logo_url:
-                fig.add_layout_image(
-                    dict(
-                        source=logo_url,
-                        xref="paper", yref="paper",
-                        x=0.5, y=0.5,
-                        sizex=0.6, sizey=0.6,
-                        xanchor="center", yanchor="middle",
-                        opacity=0.15,
-                        layer="below"
+            with profiling.stage("figure"):
+                fig = go.Figure()
+                fig.add_trace(decimate.scatter(x=df.index, y=df[metric], mode="lines", name=metric))
+                if logo_url:
+                    fig.add_layout_image(
+                        dict(
+                            source=logo_url,
+                            xref="paper", yref="paper",
+                            x=0.5, y=0.5,
+                            sizex=0.6, sizey=0.6,
+                            xanchor="center", yanchor="middle",
+                            opacity=0.15,
+                            layer="below"
+                        )
                     )
-                )
-            fig.update_layout(title=f"{selected} - {metric}", xaxis_title="Date", yaxis_title=metric)
-            st.plotly_chart(fig, use_container_width=True)
+                fig.update_layout(title=f"{selected} - {metric}", xaxis_title="Date", yaxis_title=metric)
+            profiling.plotly_chart(st, fig, use_container_width=True)
 
 # ---------------------------- Window 2 ----------------------------
-with tabs[1]:
+@st.fragment
+@profiling.fragment("stock_predictor")
+def compare_tab(tickers):
     st.header("📊 Compare Two Cryptos")
     c1, c2, c3 = st.columns(3)
     with c1:
@@ -85,19 +154,24 @@ with tabs[1]:
         metric2 = st.selectbox("Metric", ["Open", "Close", "Volume", "STD"], key="metric2")
 
     if st.button("Compare"):
+        # Date range of the first tab
+        start, end = st.session_state["start"], st.session_state["end"]
         df1 = fetch_data(s1, start, end)
         df2 = fetch_data(s2, start, end)
         if df1.empty or df2.empty:
             st.warning("No data for one or both selected cryptos.")
         else:
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=df1.index, y=df1[metric2], name=s1))
-            fig.add_trace(go.Scatter(x=df2.index, y=df2[metric2], name=s2))
-            fig.update_layout(title=f"Comparison: {s1} vs {s2} ({metric2})", xaxis_title="Date", yaxis_title=metric2)
-            st.plotly_chart(fig, use_container_width=True)
+            with profiling.stage("figure"):
+                fig = go.Figure()
+                fig.add_trace(decimate.scatter(x=df1.index, y=df1[metric2], name=s1))
+                fig.add_trace(decimate.scatter(x=df2.index, y=df2[metric2], name=s2))
+                fig.update_layout(title=f"Comparison: {s1} vs {s2} ({metric2})", xaxis_title="Date", yaxis_title=metric2)
+            profiling.plotly_chart(st, fig, use_container_width=True)
 
 # ---------------------------- Window 3 ----------------------------
-with tabs[2]:
+@st.fragment
+@profiling.fragment("stock_predictor")
+def ema_tab(tickers):
     st.header("📉 Buy/Sell Signal using EMA Strategy")
     stock = st.selectbox("Choose Crypto", tickers, key="ema_stock")
     start2 = st.date_input("Start Date for EMA", datetime.date(2022, 1, 1), key="start_ema")
@@ -108,74 +182,171 @@ with tabs[2]:
         if df.empty or len(df) < 30:
             st.warning("Not enough data for EMA analysis.")
         else:
-            df["EMA12"] = df["Close"].ewm(span=12, adjust=False).mean()
-            df["EMA26"] = df["Close"].ewm(span=26, adjust=False).mean()
+            df = df.join(indicators.for_bars(df, ["EMA12", "EMA26"], stock))
 
             signal = "BUY" if df["EMA12"].iloc[-1] > df["EMA26"].iloc[-1] else "SELL"
             st.subheader(f"Recommendation: **{signal}**")
 
             logo_url = fetch_logo(COIN_GECKO_MAP.get(stock))
-            fig = go.Figure()
-            fig.add_trace(go.Scatter(x=df.index, y=df["Close"], name="Close"))
-            fig.add_trace(go.Scatter(x=df.index, y=df["EMA12"], name="EMA12"))
-            fig.add_trace(go.Scatter(x=df.index, y=df["EMA26"], name="EMA26"))
-            if logo_url:
-                fig.add_layout_image(
-                    dict(
-                        source=logo_url,
-                        xref="paper", yref="paper",
-                        x=0.5, y=0.5,
-                        sizex=0.6, sizey=0.6,
-                        xanchor="center", yanchor="middle",
-                        opacity=0.15,
-                        layer="below"
+            with profiling.stage("figure"):
+                fig = go.Figure()
+                fig.add_trace(decimate.scatter(x=df.index, y=df["Close"], name="Close"))
+                fig.add_trace(decimate.scatter(x=df.index, y=df["EMA12"], name="EMA12"))
+                fig.add_trace(decimate.scatter(x=df.index, y=df["EMA26"], name="EMA26"))
+                if logo_url:
+                    fig.add_layout_image(
+                        dict(
+                            source=logo_url,
+                            xref="paper", yref="paper",
+                            x=0.5, y=0.5,
+                            sizex=0.6, sizey=0.6,
+                            xanchor="center", yanchor="middle",
+                            opacity=0.15,
+                            layer="below"
+                        )
                     )
-                )
-            fig.update_layout(title=f"{stock} - EMA Strategy", xaxis_title="Date", yaxis_title="Price")
-            st.plotly_chart(fig, use_container_width=True)
+                fig.update_layout(title=f"{stock} - EMA Strategy", xaxis_title="Date", yaxis_title="Price")
+            profiling.plotly_chart(st, fig, use_container_width=True)
 
 # ---------------------------- Window 4 ----------------------------
-with tabs[3]:
+@st.fragment
+def live_tab(tickers):
     st.header("💹 Live Crypto Price Streaming (Full Day)")
     live_coin = st.selectbox("Choose Crypto to Stream", tickers, key="live_coin")
-    placeholder = st.empty()
 
     if st.button("Start Live Stream"):
-        today = datetime.datetime.now().date()
-        start_time = datetime.datetime.combine(today, datetime.time(0, 0))
-
-        for _ in range(300):  # stream for 300 seconds
-            try:
-                now = datetime.datetime.now()
-
-                df = yf.download(
-                    tickers=live_coin,
-                    start=start_time,
-                    end=now,
-                    interval="1m",
-                    progress=False
-                )
-
-                if df.empty:
-                    st.warning("No live data yet. Please try again later.")
-                    break
-
-                # Fix the DataFrame
-                df = df.reset_index()
-                times = df["Datetime"].tolist()
-                prices = df["Close"].astype(float).tolist()
+        previous = st.session_state.get("live_stream")
+        if previous and previous != live_coin:
+            live.hub().unsubscribe(session_id(), previous)
+        st.session_state["live_stream"] = live_coin
+        st.session_state["live_until"] = time.time() + 300
 
-                fig = go.Figure()
-                fig.add_trace(go.Scatter(x=times, y=prices, mode="lines", name="Price"))
-                fig.update_layout(
-                    title=f"{live_coin} Full-Day Live Chart",
-                    xaxis_title="Time",
-                    yaxis_title="Price",
-                    xaxis=dict(showspikes=True),
-                )
-                placeholder.plotly_chart(fig, use_container_width=True)
-                time.sleep(1)
-
-            except Exception as e:
-                st.error(f"Error: {e}")
-                break
+    live_stream_panel()
+
+# ---------------------------- Window 5 ----------------------------
+@st.fragment
+@profiling.fragment("stock_predictor")
+def screener_tab(tickers):
+    st.header("🔎 EMA Screener (All Cryptos)")
+    start3 = st.date_input("Start Date for Screener", datetime.date(2022, 1, 1), key="start_screen")
+    end3 = st.date_input("End Date for Screener", datetime.date.today(), key="end_screen")
+
+    # Show the scheduled precompute result until a fresh run is requested
+    table, computed_at = screener.load_precomputed()
+    if table is not None and not st.session_state.get("screener_ran"):
+        st.caption(f"Precomputed at {computed_at:%Y-%m-%d %H:%M}")
+        st.dataframe(table, use_container_width=True, hide_index=True)
+
+    if st.button("Run Screener"):
+        st.session_state["screener_ran"] = True
+        table, errors = run_screener(tickers, start3, end3)
+        if table.empty:
+            st.warning("No symbol had enough data for EMA analysis.")
+        else:
+            table["Strength"] = screener.strength(table)
+            buys = int((table["Signal"] == "BUY").sum())
+            st.subheader(f"{buys} BUY / {len(table) - buys} SELL")
+            st.dataframe(table, use_container_width=True, hide_index=True)
+        if errors:
+            st.caption("Skipped: " + ", ".join(f"{t} ({e})" for t, e in errors.items()))
+
+# ---------------------------- Window 6 ----------------------------
+@st.fragment
+@profiling.fragment("stock_predictor")
+def correlation_tab(tickers):
+    st.header("🧮 Return Correlations")
+    chosen = st.multiselect("Cryptos", tickers, default=list(tickers), key="corr_tickers")
+    c1, c2, c3 = st.columns(3)
+    with c1:
+        start4 = st.date_input("Start Date for Correlation", datetime.date(2022, 1, 1), key="start_corr")
+    with c2:
+        end4 = st.date_input("End Date for Correlation", datetime.date.today(), key="end_corr")
+    with c3:
+        window = st.slider("Rolling window (days)", 5, 180, 30, key="corr_window")
+
+    # Nothing is loaded until asked for; later reruns of the tab keep the result
+    if st.button("Compute Correlations"):
+        st.session_state["corr_ran"] = True
+    if not st.session_state.get("corr_ran"):
+        return
+    if len(chosen) < 2:
+        st.info("Choose at least two cryptos.")
+        return
+    close, errors = load_closes(tuple(chosen), start4, end4)
+    if errors:
+        st.caption("Skipped: " + ", ".join(f"{t} ({e})" for t, e in errors.items()))
+    if close.shape[1] < 2 or len(close) <= window:
+        st.warning("Not enough data for the chosen range and window.")
+        return
+    # Full matrix and every pair's rolling correlation in one pass, cached per range and window
+    corr, roll = correlation.analyze(close, window, label=(start4, end4))
+    symbols = list(corr.columns)
+
+    with profiling.stage("figure"):
+        fig = go.Figure(go.Heatmap(z=corr.values, x=symbols, y=symbols, zmin=-1, zmax=1,
+                                   colorscale="RdBu", text=corr.round(2).values, texttemplate="%{text}"))
+        fig.update_layout(title=f"Daily return correlation ({len(close)} days)", height=600)
+    profiling.plotly_chart(st, fig, use_container_width=True)
+
+    # Rolling matrix on any day of the range
+    days = list(roll.index.date)
+    day = st.select_slider("Rolling matrix on", options=days[window:], value=days[-1], key="corr_day")
+    at = correlation.matrix_at(roll, days.index(day), symbols)
+    with profiling.stage("figure"):
+        fig = go.Figure(go.Heatmap(z=at.values, x=symbols, y=symbols, zmin=-1, zmax=1, colorscale="RdBu"))
+        fig.update_layout(title=f"{window}-day rolling correlation on {day}", height=600)
+    profiling.plotly_chart(st, fig, use_container_width=True)
+
+    # Rolling lines for chosen pairs; the most correlated pairs by default
+    labels = [f"{a} / {b}" for a, b in roll.columns]
+    strongest = roll.iloc[-1].abs().sort_values(ascending=False).index[:3]
+    shown = st.multiselect("Pairs", labels, default=[f"{a} / {b}" for a, b in strongest], key="corr_pairs")
+    with profiling.stage("figure"):
+        fig = go.Figure()
+        for label in shown:
+            fig.add_trace(decimate.scatter(x=roll.index, y=roll[tuple(label.split(" / "))], name=label))
+        fig.update_layout(title=f"{window}-day rolling correlation", xaxis_title="Date",
+                          yaxis_title="Correlation", yaxis_range=[-1, 1])
+    profiling.plotly_chart(st, fig, use_container_width=True)
+
+# ---------------------------- Window 7 ----------------------------
+@st.fragment
+@profiling.fragment("stock_predictor")
+def forecast_tab(tickers):
+    st.header("🔮 Next-Day Forecast")
+    # Models are trained by `python forecast.py`; the app only reads them
+    table, computed_at = forecast.load_forecasts()
+    if table is None:
+        st.info("No forecasts yet. Run `python forecast.py` to train the models.")
+        return
+    st.caption(f"Forecast run at {computed_at:%Y-%m-%d %H:%M}")
+
+    chosen = st.selectbox("Choose Crypto", tickers, key="forecast_stock")
+    row = forecast.predict(chosen)
+    if row is None:
+        st.warning(f"No model for {chosen} yet.")
+    else:
+        # NaN: the model has fewer than forecast.MIN_ROWS training rows
+        def percent(value):
+            return "—" if pd.isna(value) else f"{value:+.2f}%"
+        c1, c2, c3 = st.columns(3)
+        c1.metric(f"Close ({row['For'] - datetime.timedelta(days=1)})", f"{row['Close']:,.2f}")
+        c2.metric(f"Predicted return for {row['For']}", percent(row["Predicted %"]),
+                  None if pd.isna(row["Predicted %"]) else row["Signal"])
+        c3.metric("Pooled model", percent(row["Pooled %"]))
+        if pd.isna(row["Predicted %"]):
+            st.caption(f"Insufficient history: {chosen}'s model needs {forecast.MIN_ROWS} training rows.")
+    st.dataframe(table, use_container_width=True, hide_index=True)
+
+# App layout
+st.set_page_config(layout="wide")
+profiling.start_run("stock_predictor", st)
+tickers = load_tickers()
+tabs = st.tabs(["📈 Single Crypto Analysis", "📊 Compare Cryptos", "📉 EMA Strategy", "💹 Live Prices", "🔎 Screener",
+                "🧮 Correlation", "🔮 Forecast"])
+for tab, render in zip(tabs, [single_tab, compare_tab, ema_tab, live_tab, screener_tab, correlation_tab,
+                              forecast_tab]):
+    with tab:
+        render(tickers)
+
+profiling.finish_run(st)
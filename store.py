@@ -0,0 +1,280 @@
+import datetime
+import json
+import os
+import re
+
+import pandas as pd
+
+import profiling
+import scheduler
+import shared_cache
+
+# Local OHLCV store: one Parquet file per symbol / interval / year plus a
+# coverage.json listing the [start, end) ranges already fetched from upstream
+# and an empty.json of ranges upstream recently answered empty for.
+STORE_DIR = os.environ.get("STOCK_STORE_DIR", "store")
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+# yfinance answers many failures with an empty frame instead of raising, so an
+# empty answer is only recorded as covered for a settled weekend of a market that
+# closes on weekends. Any other empty range is skipped for EMPTY_TTL, then asked again.
+EMPTY_TTL = pd.Timedelta(minutes=10)
+CLOSED_GRACE = pd.Timedelta(days=1)
+_CRYPTO = re.compile(r"[A-Z0-9]+-[A-Z]{3}")  # "BTC-USD": trades every day
+
+_UNITS = {"m": "min", "h": "h", "d": "D", "wk": "W"}
+
+
+# Length of one bar for a yfinance interval string ("1m", "30m", "1h", "1d", "1wk", "1mo")
+def bar_delta(interval):
+    count, unit = re.fullmatch(r"(\d+)([a-z]+)", interval).groups()
+    if unit == "mo":
+        return pd.Timedelta(days=31 * int(count))
+    return pd.Timedelta(int(count), unit=_UNITS[unit])
+
+
+def is_daily(interval):
+    return bar_delta(interval) >= pd.Timedelta(days=1)
+
+
+def to_utc(value):
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tz is None else ts.tz_convert("UTC")
+
+
+# Daily bars are stamped at midnight UTC of their trading date, intraday bars in UTC
+def normalize_index(index, interval):
+    idx = pd.DatetimeIndex(index)
+    if is_daily(interval):
+        if idx.tz is not None:
+            idx = idx.tz_localize(None)
+        idx = idx.normalize().tz_localize("UTC")
+    else:
+        idx = idx.tz_localize("UTC") if idx.tz is None else idx.tz_convert("UTC")
+    return idx.rename("Date")
+
+
+def normalize_bars(df, interval):
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.copy()
+        df.columns = df.columns.get_level_values(0)
+    df = df[[c for c in COLUMNS if c in df.columns]].copy()
+    df.index = normalize_index(df.index, interval)
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    return df.astype({c: "float64" for c in COLUMNS if c in df.columns})
+
+
+def _empty():
+    return pd.DataFrame(columns=COLUMNS, dtype="float64",
+                        index=pd.DatetimeIndex([], tz="UTC", name="Date"))
+
+
+def _symbol_dir(ticker, interval):
+    return os.path.join(STORE_DIR, interval, ticker)
+
+
+def _partition_path(ticker, interval, year):
+    return os.path.join(_symbol_dir(ticker, interval), f"{year}.parquet")
+
+
+# ---------------- Coverage ----------------
+def load_coverage(ticker, interval="1d"):
+    path = os.path.join(_symbol_dir(ticker, interval), "coverage.json")
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [(pd.Timestamp(s), pd.Timestamp(e)) for s, e in json.load(f)]
+
+
+def _save_coverage(ticker, interval, ranges):
+    path = os.path.join(_symbol_dir(ticker, interval), "coverage.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump([[s.isoformat(), e.isoformat()] for s, e in ranges], f)
+    os.replace(tmp, path)
+
+
+def mark_covered(ticker, interval, start, end):
+    covered = load_coverage(ticker, interval) + [(to_utc(start), to_utc(end))]
+    os.makedirs(_symbol_dir(ticker, interval), exist_ok=True)
+    _save_coverage(ticker, interval, merge_ranges(covered))
+
+
+# Ranges upstream recently answered empty for: [(start, end)] still inside EMPTY_TTL
+def load_empty(ticker, interval="1d"):
+    path = os.path.join(_symbol_dir(ticker, interval), "empty.json")
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        entries = json.load(f)
+    now = to_utc(datetime.datetime.now(datetime.timezone.utc))
+    return [(pd.Timestamp(s), pd.Timestamp(e)) for s, e, at in entries
+            if now - pd.Timestamp(at) < EMPTY_TTL]
+
+
+def _mark_empty(ticker, interval, ranges):
+    now = to_utc(datetime.datetime.now(datetime.timezone.utc))
+    entries = [(s, e, now) for s, e in ranges]
+    path = os.path.join(_symbol_dir(ticker, interval), "empty.json")
+    if os.path.exists(path):
+        with open(path) as f:
+            entries += [(pd.Timestamp(s), pd.Timestamp(e), pd.Timestamp(at)) for s, e, at in json.load(f)
+                        if now - pd.Timestamp(at) < EMPTY_TTL]
+    os.makedirs(_symbol_dir(ticker, interval), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump([[s.isoformat(), e.isoformat(), at.isoformat()] for s, e, at in entries], f)
+    os.replace(tmp, path)
+
+
+def merge_ranges(ranges):
+    merged = []
+    for s, e in sorted(ranges):
+        if merged and s <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], e))
+        else:
+            merged.append((s, e))
+    return merged
+
+
+# Parts of [start, end) not yet covered by the store
+def missing_ranges(covered, start, end):
+    gaps = []
+    cursor = start
+    for s, e in merge_ranges(covered):
+        if e <= cursor:
+            continue
+        if s >= end:
+            break
+        if s > cursor:
+            gaps.append((cursor, min(s, end)))
+        cursor = max(cursor, e)
+    if cursor < end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+# ---------------- Read / write ----------------
+def write_bars(ticker, interval, bars):
+    if bars.empty:
+        return
+    os.makedirs(_symbol_dir(ticker, interval), exist_ok=True)
+    row_group = 10_000 if not is_daily(interval) else None
+    for year, chunk in bars.groupby(bars.index.year):
+        path = _partition_path(ticker, interval, year)
+        if os.path.exists(path):
+            chunk = pd.concat([pd.read_parquet(path), chunk])
+            chunk = chunk[~chunk.index.duplicated(keep="last")].sort_index()
+        tmp = path + ".tmp"
+        chunk.to_parquet(tmp, row_group_size=row_group)
+        os.replace(tmp, path)
+
+
+# Read [start, end) from disk only, touching just the year partitions involved
+def read_slice(ticker, start, end, interval="1d"):
+    start, end = to_utc(start), to_utc(end)
+    if end <= start:
+        return _empty()
+    filters = [("Date", ">=", start), ("Date", "<", end)]
+    parts = []
+    for year in range(start.year, (end - pd.Timedelta(1)).year + 1):
+        path = _partition_path(ticker, interval, year)
+        if os.path.exists(path):
+            parts.append(pd.read_parquet(path, filters=filters))
+    parts = [p for p in parts if not p.empty]
+    if not parts:
+        return _empty()
+    return pd.concat(parts).sort_index()
+
+
+# ---------------- Derived results ----------------
+# Precomputed frames (indicators, signals) kept beside the bars, per symbol
+# when `ticker` is given, otherwise per interval.
+def derived_path(interval, name, ticker=None):
+    folder = _symbol_dir(ticker, interval) if ticker else os.path.join(STORE_DIR, interval)
+    return os.path.join(folder, f"{name}.parquet")
+
+
+def write_derived(df, interval, name, ticker=None):
+    path = derived_path(interval, name, ticker)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    df.to_parquet(tmp)
+    os.replace(tmp, path)
+
+
+def read_derived(interval, name, ticker=None):
+    path = derived_path(interval, name, ticker)
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path)
+
+
+def _download(ticker, start, end, interval):
+    df = scheduler.call("yahoo", scheduler.HISTORY, scheduler.yahoo().Ticker(ticker).history,
+                        start=start, end=end, interval=interval)
+    return normalize_bars(df, interval)
+
+
+# The bar that is still forming is never marked as covered, so it is refetched
+def _settled_until(interval):
+    now = to_utc(datetime.datetime.now(datetime.timezone.utc))
+    return now.floor("D") if is_daily(interval) else now.floor(bar_delta(interval))
+
+
+# [start, end) falls on a weekend, when a market that is not crypto has no bars
+def _closed_span(ticker, start, end):
+    if _CRYPTO.fullmatch(ticker):
+        return False
+    days = pd.date_range(start.floor("D"), (end - pd.Timedelta(1)).floor("D"), freq="D")
+    return bool((days.dayofweek >= 5).all())
+
+
+def _fill_gaps(ticker, interval, start, end):
+    covered = load_coverage(ticker, interval)
+    gaps = missing_ranges(covered + load_empty(ticker, interval), start, end)
+    if not gaps:
+        return
+    settled = _settled_until(interval)
+    empty = []
+    for gap_start, gap_end in gaps:
+        bars = _download(ticker, gap_start, gap_end, interval)
+        if bars.empty and not (gap_end <= settled - CLOSED_GRACE
+                               and _closed_span(ticker, gap_start, gap_end)):
+            empty.append((gap_start, gap_end))
+            continue
+        write_bars(ticker, interval, bars)
+        if min(gap_end, settled) > gap_start:
+            covered.append((gap_start, min(gap_end, settled)))
+    os.makedirs(_symbol_dir(ticker, interval), exist_ok=True)
+    _save_coverage(ticker, interval, merge_ranges(covered))
+    if empty:
+        _mark_empty(ticker, interval, empty)
+
+
+# Fetch only the gaps in [start, end), append them, then serve the slice locally.
+# One process at a time fills a symbol's gaps; concurrent callers wait for it and
+# then find the range covered, so any sub-range of a stored range is a local read.
+def read_history(ticker, start, end, interval="1d"):
+    start, end = to_utc(start), to_utc(end)
+    gaps = missing_ranges(load_coverage(ticker, interval) + load_empty(ticker, interval), start, end)
+    profiling.count("store", hit=not gaps)
+    if gaps:
+        with profiling.stage("store_fill", ticker=ticker, gaps=len(gaps)):
+            with shared_cache.cache(STORE_DIR).lock(("store", ticker, interval)):
+                _fill_gaps(ticker, interval, start, end)
+    with profiling.stage("store_read", ticker=ticker) as record:
+        df = read_slice(ticker, start, end, interval)
+        record["rows"] = len(df)
+    return df
+
+
+# Start of a yfinance-style period ("5d", "1mo", "ytd", "max") ending at `now`
+def period_start(period, now):
+    if period == "max":
+        return pd.Timestamp("1970-01-01", tz="UTC")
+    if period == "ytd":
+        return now.floor("D").replace(month=1, day=1)
+    count, unit = re.fullmatch(r"(\d+)([a-z]+)", period).groups()
+    offsets = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+    return now - pd.DateOffset(**{offsets[unit]: int(count)})
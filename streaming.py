@@ -0,0 +1,146 @@
+import math
+from collections import deque
+
+import numpy as np
+
+import indicators
+
+# Constant-time-per-bar versions of the indicators in indicators.py, for live
+# data. Each object is seeded from history with the vectorized formulas and
+# then advanced one bar at a time:
+#   update(x)  - a new bar closed at x
+#   revise(x)  - the latest bar (still forming) now closes at x
+# Inputs are assumed finite; callers drop NaN closes first.
+
+
+class StreamingEMA:
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = math.nan
+        self._prev = math.nan  # value before the latest bar, for revise()
+
+    def _step(self, prev, x):
+        return x if math.isnan(prev) else prev + self.alpha * (x - prev)
+
+    # Same as close.ewm(span, adjust=False).mean(); returns the full history
+    def seed(self, history):
+        values = indicators.ema(np.asarray(history, dtype="float64")[:, None], self.span)[:, 0]
+        self.value = values[-1] if len(values) else math.nan
+        self._prev = values[-2] if len(values) > 1 else math.nan
+        return values
+
+    def update(self, x):
+        self._prev = self.value
+        self.value = self._step(self._prev, x)
+        return self.value
+
+    def revise(self, x):
+        self.value = self._step(self._prev, x)
+        return self.value
+
+
+# Windowed Welford variance, matching close.rolling(window).std()
+class StreamingStd:
+    RESYNC_EVERY = 4096  # recompute from the window now and then to stop float drift
+
+    def __init__(self, window):
+        self.window = window
+        self._values = deque()
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._updates = 0
+
+    @property
+    def value(self):
+        if len(self._values) < self.window or self.window < 2:
+            return math.nan
+        return math.sqrt(max(self._m2, 0.0) / (self.window - 1))
+
+    def _add(self, x):
+        self._values.append(x)
+        delta = x - self._mean
+        self._mean += delta / len(self._values)
+        self._m2 += delta * (x - self._mean)
+
+    def _remove(self, x):
+        n = len(self._values)
+        if n == 0:
+            self._mean = self._m2 = 0.0
+            return
+        delta = x - self._mean
+        self._mean -= delta / n
+        self._m2 -= delta * (x - self._mean)
+
+    def _resync(self):
+        values = np.fromiter(self._values, dtype="float64", count=len(self._values))
+        self._mean = values.mean() if len(values) else 0.0
+        self._m2 = ((values - self._mean) ** 2).sum() if len(values) else 0.0
+
+    def seed(self, history):
+        history = np.asarray(history, dtype="float64")
+        self._values = deque(history[-self.window:].tolist())
+        self._resync()
+        return indicators.rolling_std(history[:, None], self.window)[:, 0]
+
+    def update(self, x):
+        if len(self._values) == self.window:
+            self._remove(self._values.popleft())
+        self._add(x)
+        self._updates += 1
+        if self._updates % self.RESYNC_EVERY == 0:
+            self._resync()
+        return self.value
+
+    def revise(self, x):
+        if self._values:
+            self._remove(self._values.pop())
+        self._add(x)
+        return self.value
+
+
+# EMA fast/slow crossover state, the BUY/SELL rule used by the dashboards
+class Crossover:
+    def __init__(self, fast=12, slow=26):
+        self.fast = StreamingEMA(fast)
+        self.slow = StreamingEMA(slow)
+        self._prev_signal = None  # signal as of the previous bar
+
+    @property
+    def signal(self):
+        if math.isnan(self.fast.value) or math.isnan(self.slow.value):
+            return None
+        return "BUY" if self.fast.value > self.slow.value else "SELL"
+
+    # True when the latest bar flipped the signal
+    @property
+    def crossed(self):
+        return self._prev_signal is not None and self.signal != self._prev_signal
+
+    def seed(self, history):
+        fast = self.fast.seed(history)
+        slow = self.slow.seed(history)
+        if len(fast) > 1:
+            self._prev_signal = "BUY" if fast[-2] > slow[-2] else "SELL"
+        return self.signal
+
+    def update(self, x):
+        self._prev_signal = self.signal
+        self.fast.update(x)
+        self.slow.update(x)
+        return self.signal
+
+    def revise(self, x):
+        self.fast.revise(x)
+        self.slow.revise(x)
+        return self.signal
+
+
+# Streaming object for an indicator name ("EMA12", "STD5")
+def make(name):
+    kind, n = indicators.parse(name)
+    if kind == "EMA":
+        return StreamingEMA(n)
+    if kind == "STD":
+        return StreamingStd(n)
+    raise ValueError(f"No streaming version of {name}")
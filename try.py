@@ -1,18 +1,21 @@
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 import plotly.graph_objs as go
 import datetime
 
+import decimate
+import scheduler
+import indicators
+
 # Load ticker list from CSV
 ticker_df = pd.read_csv("crypto_tickers_inr.csv")
 tickers = ticker_df.iloc[:, 0].dropna().unique().tolist()
 
 # Function to fetch data
 def fetch_data(ticker, start, end):
-    df = yf.download(ticker, start=start, end=end)
+    df = scheduler.call("yahoo", scheduler.HISTORY, scheduler.yahoo().download, ticker, start=start, end=end)
     if not df.empty:
-        df['Std Dev'] = df['Close'].rolling(window=10).std()
+        df['Std Dev'] = indicators.for_series(df['Close'], ["STD10"], label=ticker)["STD10"]
     return df
 
 # Function to apply logo background
@@ -47,7 +50,7 @@ if ticker:
 
     if not df.empty and metric in df.columns:
         fig = go.Figure()
-        fig.add_trace(go.Scatter(x=df.index, y=df[metric], mode='lines', name=metric))
+        fig.add_trace(decimate.scatter(x=df.index, y=df[metric], mode='lines', name=metric))
         fig.update_layout(title=f"{ticker} - {metric}", xaxis_title="Date", yaxis_title=metric)
         st.plotly_chart(fig, use_container_width=True)
     else: